@@ -49,3 +49,5 @@ import pluggdapps.commands.serve
 import pluggdapps.commands.pviews
 import pluggdapps.commands.unittest
 import pluggdapps.commands.confdoc
+import pluggdapps.commands.precompress
+import pluggdapps.commands.compiletemplates
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import os
+from   os.path import join, isdir, isfile, splitext
+
+from   pluggdapps.plugin       import implements, Singleton
+from   pluggdapps.interfaces   import ITemplate, ICommand
+from   pluggdapps.web.response import HTTPResponse
+import pluggdapps.utils        as h
+
+class CompileTemplates( Singleton ):
+    """Sub-command plugin to compile template files at deploy time, so that
+    they are not compiled while serving requests. Template files, or
+    directories containing template files, can be supplied as file paths or
+    in :term:`asset specification` format. If none are supplied, template
+    files listed as ``ttlplugins`` by pluggdapps packages are compiled.
+
+    .. code-block:: text
+        :linenos:
+
+        $ pa compiletemplates [<path> ...]
+
+    Renderer plugin for a template file is resolved based on its
+    file-extension, like ``render()`` method of
+    :class:`pluggdapps.web.response.HTTPResponse`. Only renderer plugins that
+    support :meth:`pluggdapps.interfaces.ITemplate.compile` method are
+    used, other template files are skipped without counting them.
+    """
+
+    implements( ICommand )
+
+    description = "Compile template files."
+    cmd = 'compiletemplates'
+
+    #---- ICommand API methods
+
+    def subparser( self, parser, subparsers ):
+        """:meth:`pluggdapps.interfaces.ICommand.subparser` interface
+        method."""
+        self.subparser = subparsers.add_parser(
+                                self.cmd, description=self.description )
+        self.subparser.set_defaults( handler=self.handle )
+        self.subparser.add_argument(
+            "paths", nargs="*",
+            help="Template files or directories to compile" )
+        return parser
+
+    def handle( self, args ):
+        """:meth:`pluggdapps.interfaces.ICommand.handle` interface method."""
+        from pluggdapps import papackages
+
+        specs = args.paths or h.flatten(
+                    [ n.get( 'ttlplugins', [] ) for n in papackages.values() ])
+        count, failed = 0, 0
+        for tfile in self._tfiles( specs ) :
+            _, ext = splitext( tfile )
+            renderer = HTTPResponse._renderers.get( ext, None )
+            plugin = self.qp( ITemplate, renderer ) if renderer else None
+            if not hasattr( plugin, 'compile' ) : continue
+            try :
+                plugin.compile( tfile )
+                count += 1
+            except Exception as e :
+                print( "Failed compiling %r : %s" % (tfile, e) )
+                failed += 1
+        print( "Compiled %s templates, %s failed" % (count, failed) )
+
+    #---- Internal functions
+
+    def _tfiles( self, specs ):
+        """Generate template files from a list of file paths, directories
+        and asset specifications."""
+        for spec in specs :
+            path = h.abspath_from_asset_spec( spec )
+            if isfile( path ) :
+                yield path
+            elif isdir( path ) :
+                for dirpath, dirs, files in os.walk( path ) :
+                    for f in sorted( files ) :
+                        if splitext( f )[1] in HTTPResponse._renderers :
+                            yield join( dirpath, f )
+            else :
+                print( "Template not found %r" % spec )
+
+    #---- ISettings interface methods
+
+    @classmethod
+    def default_settings( cls ):
+        """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
+        method."""
+        return _default_settings
+
+    @classmethod
+    def normalize_settings( cls, sett ):
+        """:meth:`pluggdapps.plugin.ISettings.normalize_settings` interface
+        method."""
+        return sett
+
+
+_default_settings = h.ConfigDict()
+_default_settings.__doc__ = CompileTemplates.__doc__
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import os, zlib, mimetypes
+from   os.path import join, isfile, isdir, getmtime
+
+from   pluggdapps.plugin         import implements, Singleton
+from   pluggdapps.interfaces     import ICommand
+from   pluggdapps.web.interfaces import IHTTPOutBound, IHTTPRouter
+from   pluggdapps.web.gzip       import compressible
+import pluggdapps.utils          as h
+
+class Precompress( Singleton ):
+    """Sub-command plugin to pre-compress static documents served by
+    web-applications, so that they are not compressed for every request.
+    Walks the root location of every view served by
+    ``pluggdapps.StaticView`` or ``pluggdapps.DocRootView`` plugins, and
+    whose ``content_coding`` includes gzip. For each document, a ``.gz``
+    sibling is written at maximum compression level, unless the sibling is
+    already newer than the document.
+
+    Only documents that are compressible, as per ``media_types`` and
+    ``min_length`` settings of web-application's ``pluggdapps.GZipOutBound``
+    plugin, are compressed. Note that the main script must be invoked using
+    `webapps` platform, the ``-w`` switch.
+
+    .. code-block:: text
+        :linenos:
+
+        $ pa -w precompress [-n <netpath>] [-l <level>] [-f]
+
+    At request time, static views send the ``.gz`` sibling when the client
+    accepts gzip content-coding.
+    """
+
+    implements( ICommand )
+
+    description = "Pre-compress static documents served by web-applications."
+    cmd = 'precompress'
+
+    views = [ 'pluggdapps.staticview', 'pluggdapps.docrootview' ]
+    """View plugins serving static documents."""
+
+    #---- ICommand API methods
+
+    def subparser( self, parser, subparsers ):
+        """:meth:`pluggdapps.interfaces.ICommand.subparser` interface
+        method."""
+        self.subparser = subparsers.add_parser(
+                                self.cmd, description=self.description )
+        self.subparser.set_defaults( handler=self.handle )
+        self.subparser.add_argument(
+            "-n", dest="netpath",
+            default=None,
+            help="Pre-compress documents of application mounted on <netpath>" )
+        self.subparser.add_argument(
+            "-l", dest="level",
+            type=int, default=9,
+            help="Compression level" )
+        self.subparser.add_argument(
+            "-f", dest="force",
+            action="store_true", default=False,
+            help="Compress even if .gz file is up-to-date" )
+        return parser
+
+    def handle( self, args ):
+        """:meth:`pluggdapps.interfaces.ICommand.handle` interface method."""
+        for instkey, webapp in getattr( self.pa, 'webapps', {} ).items() :
+            appsec, netpath, instconfig = instkey
+            if args.netpath and args.netpath != netpath : continue
+
+            gz = webapp.qp( IHTTPOutBound, 'pluggdapps.GZipOutBound' )
+            for rootloc in self._rootlocs( webapp ) :
+                count = 0
+                for dirpath, dirs, files in os.walk( rootloc ) :
+                    for f in files :
+                        docfile = join( dirpath, f )
+                        count += self._compress( gz, docfile, args ) or 0
+                print( "%s : %s compressed %s documents" % (
+                       netpath, rootloc, count ))
+
+    #---- Internal functions
+
+    def _rootlocs( self, webapp ):
+        """Root locations of static views whose content-coding is gzip."""
+        router = getattr( webapp, 'router', None )
+        if router is None :     # Application is not started.
+            router = webapp.qp( IHTTPRouter, webapp['IHTTPRouter'] )
+            router.onboot()
+
+        rootlocs = []
+        for view in router.views.values() :
+            name = h.strof( view['view'] or '' ).lower()
+            if name not in self.views : continue
+            if 'gzip' not in ( view['content_coding'] or '' ) : continue
+            if name == 'pluggdapps.docrootview' :
+                rootloc = view.get( 'rootloc', webapp['rootloc'] )
+            else :
+                rootloc = h.abspath_from_asset_spec( view['rootloc'] )
+            if isdir( rootloc ) and rootloc not in rootlocs :
+                rootlocs.append( rootloc )
+        return rootlocs
+
+    def _compress( self, gz, docfile, args ):
+        """Write ``docfile``'s ``.gz`` sibling. Return True if written."""
+        if docfile.endswith( '.gz' ) : return False
+        (typ, enc) = mimetypes.guess_type( docfile )
+        if enc or not typ or not compressible( typ, gz['media_types'] ) :
+            return False
+        if os.stat( docfile ).st_size < gz['min_length'] : return False
+
+        gzfile = docfile + '.gz'
+        if not args.force and isfile( gzfile ) and \
+           getmtime( gzfile ) >= getmtime( docfile ) :
+            return False
+
+        c = zlib.compressobj( args.level, zlib.DEFLATED, 16+zlib.MAX_WBITS )
+        data = c.compress( open( docfile, 'rb' ).read() ) + c.flush()
+        tmpfile = gzfile + '.tmp'
+        open( tmpfile, 'wb' ).write( data )
+        os.replace( tmpfile, gzfile )   # Atomic, for concurrent readers.
+        return True
+
+    #---- ISettings interface methods
+
+    @classmethod
+    def default_settings( cls ):
+        """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
+        method."""
+        return _default_settings
+
+    @classmethod
+    def normalize_settings( cls, sett ):
+        """:meth:`pluggdapps.plugin.ISettings.normalize_settings` interface
+        method."""
+        return sett
+
+
+_default_settings = h.ConfigDict()
+_default_settings.__doc__ = Precompress.__doc__
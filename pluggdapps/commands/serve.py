@@ -160,7 +160,7 @@ class Serve( Singleton ):
             [ list( map( h.abspath_from_asset_spec, n.get('ttlplugins', []) ))
               for nm, n in papackages.items() ]
         )
-        return ttlfiles + self.pa._monitoredfiles
+        return ttlfiles + sorted( self.pa._monitoredfiles )
 
     #---- ISettings interface methods
 
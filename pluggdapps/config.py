@@ -25,6 +25,11 @@ from   pluggdapps.plugin      import Plugin, implements
 from   pluggdapps.interfaces  import IConfigDB
 import pluggdapps.utils       as h
 
+def quote( name ):
+    """Quote ``name`` as sqlite identifier. Table names cannot be passed as
+    statement parameters."""
+    return '"%s"' % name.replace( '"', '""' )
+
 class ConfigSqlite3DB( Plugin ):
     """Backend interface to persist configuration information in sqlite3
     database.
@@ -57,13 +62,24 @@ class ConfigSqlite3DB( Plugin ):
 
     implements( IConfigDB )
 
+    _tables = {}
+    """In-memory copy of configuration tables, dictionary of netpath and its
+    sections. Tables are read from database once, after which reads are
+    served from memory and writes update both database and memory."""
+
     def __init__( self ):
-        self.conn = sqlite3.connect( self['url'] ) if self['url'] else None
+        self.conn = None
+        self._tables = {}
+        self.connect()
 
     def connect( self, *args, **kwargs ):
-        """:meth:`pluggdapps.interfaces.IConfigDB.connect` interface method."""
+        """:meth:`pluggdapps.interfaces.IConfigDB.connect` interface method.
+        Database is opened in write-ahead-log mode, so that readers do not
+        block the writer."""
         if self.conn == None and self['url'] :
             self.conn = sqlite3.connect( self['url'] )
+            self.conn.execute( "PRAGMA journal_mode=WAL" )
+            self.conn.execute( "PRAGMA synchronous=NORMAL" )
 
     def dbinit( self, netpaths=[] ):
         """:meth:`pluggdapps.interfaces.IConfigDB.dbinit` interface method.
@@ -73,22 +89,20 @@ class ConfigSqlite3DB( Plugin ):
         ``netpaths``,
             list of web-application mount points. A database table will be
             created for each netpath.
+
+        All tables are created in a single transaction.
         """
         if self.conn == None : return None
 
-        c = self.conn.cursor()
-        # Create the `platform` table if it does not exist.
-        c.execute(
-            "CREATE TABLE IF NOT EXISTS platform "
-                "(section TEXT PRIMARY KEY ASC, settings TEXT);" )
-        self.conn.commit()
-
-        for netpath in netpaths :
-            sql = ( "CREATE TABLE IF NOT EXISTS '%s' "
-                        "(section TEXT PRIMARY KEY ASC, settings TEXT);" ) %\
-                  netpath
-            c.execute( sql )
-            self.conn.commit()
+        with self.conn :
+            # sqlite3 module does not implicitly begin a transaction for DDL.
+            self.conn.execute( "BEGIN" )
+            # Create `platform` table and netpath tables if they do not exist.
+            for table in [ 'platform' ] + list( netpaths ) :
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS %s "
+                    "(section TEXT PRIMARY KEY ASC, settings TEXT);" %
+                    quote( table ))
 
     def config( self, **kwargs ):
         """:meth:`pluggdapps.interfaces.IConfigDB.config` interface method.
@@ -128,36 +142,72 @@ class ConfigSqlite3DB( Plugin ):
         name = kwargs.get( 'name', None )
         value = kwargs.get( 'value', None )
 
-        c = self.conn.cursor()
-        if section :
-            c.execute(
-                "SELECT * FROM '%s' WHERE section='%s'" % (netpath,section))
-            result = list(c) 
-            secsetts = h.json_decode( result[0][1] ) if result else {}
-            if name and value :
-                secsetts[name] = value
-                secsetts = h.json_encode(secsetts)
-                c.execute( "DELETE FROM '%s' WHERE section='%s'" % 
-                           (netpath, section) )
-                c.execute( "INSERT INTO '%s' VALUES ('%s', '%s')" %
-                           (netpath, section, secsetts) )
-                self.conn.commit()
-                rc = value
-            elif name :
-                rc = secsetts[name]
-            else :
-                rc = secsetts
+        table = self._table( netpath )
+        if section and name and value :
+            secsetts = dict( table.get( section, {} ))
+            secsetts[name] = value
+            with self.conn :
+                self.conn.execute(
+                    "INSERT INTO %s (section, settings) VALUES (?, ?) "
+                    "ON CONFLICT (section) DO UPDATE "
+                    "SET settings=excluded.settings" % quote( netpath ),
+                    (section, h.json_encode( secsetts )) )
+            table[section] = secsetts
+            rc = value
+        elif section and name :
+            rc = table.get( section, {} )[name]
+        elif section :
+            rc = dict( table.get( section, {} ))
         else :
-            c.execute( "SELECT * FROM '%s'" % (netpath,) )
-            rc = {  section : h.json_decode( setts )
-                                        for section, setts in list(c) }
+            rc = { section : dict(setts) for section, setts in table.items() }
         return rc
 
+    def configs( self, netpaths ):
+        """Return a dictionary of netpath and its entire table, as
+        dictionary of sections and settings, for each netpath in
+        ``netpaths``. Tables are read together using compound SELECT
+        statements, in a single transaction, so that booting a platform with
+        several mounted applications does not query the database for each
+        one of them."""
+        if self.conn == None : return {}
+
+        rc = { netpath : {} for netpath in netpaths }
+        netpaths = list( rc.keys() )
+        with self.conn :
+            self.conn.execute( "BEGIN" )  # Consistent read across chunks.
+            for i in range( 0, len(netpaths), self.COMPOUND_LIMIT ) :
+                chunk = netpaths[ i : i+self.COMPOUND_LIMIT ]
+                sql = " UNION ALL ".join(
+                        "SELECT ?, section, settings FROM %s" % quote(netpath)
+                        for netpath in chunk )
+                for netpath, section, setts in self.conn.execute(sql, chunk) :
+                    rc[netpath][section] = h.json_decode( setts )
+        self._tables.update( rc )
+        return { netpath : { section : dict(setts)
+                             for section, setts in table.items() }
+                 for netpath, table in rc.items() }
+
     def close( self ):
         """:meth:`pluggdapps.interfaces.IConfigDB.close` interface method."""
         if self.conn :
             self.conn.close()
 
+    #-- local methods
+
+    COMPOUND_LIMIT = 256
+    """Maximum number of tables to read in a single compound SELECT. Sqlite
+    limits the number of terms in a compound SELECT to 500 by default."""
+
+    def _table( self, netpath ):
+        """Return in-memory copy of ``netpath`` table, as dictionary of
+        sections and settings, reading it from database on first access."""
+        if netpath not in self._tables :
+            c = self.conn.execute(
+                    "SELECT section, settings FROM %s" % quote( netpath ))
+            self._tables[ netpath ] = {
+                    section : h.json_decode( setts ) for section, setts in c }
+        return self._tables[ netpath ]
+
     #---- ISettings interface methods
 
     @classmethod
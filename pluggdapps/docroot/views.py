@@ -4,12 +4,13 @@
 # file 'LICENSE', which is part of this source code package.
 #       Copyright (c) 2011 R Pratap Chakravarthy
 
-import os, mimetypes
-from   os.path          import join, isfile
+from   os.path          import join
 
 import pluggdapps.utils          as h
 from   pluggdapps.plugin         import Plugin, implements
 from   pluggdapps.web.interfaces import IHTTPView
+from   pluggdapps.web.staticview import byteranges, sendranges, docinfo, \
+                                        docbody, precompressed
 
 class DocRootView( Plugin ):
     """View callable to server static documents as web pages. Implemented as
@@ -34,26 +35,39 @@ class DocRootView( Plugin ):
             path = self.webapp['favicon']
         c['rootloc'] = self.view.get( 'rootloc', self.webapp['rootloc'] )
         docfile = join( c['rootloc'], path )
+        info = docinfo( self, docfile ) if docfile else None
 
-        if docfile and isfile( docfile ) :
+        if info :
             # Collect information about the document, for response.
             resp.set_status( b'200' )
-            stat = os.stat( docfile )
-            (typ, enc) = mimetypes.guess_type( docfile )
-            if typ :
-                resp.media_type = typ
-            if enc :
-                resp.content_coding = enc
+            if info.typ :
+                resp.media_type = info.typ
+            if info.enc :
+                resp.content_coding = info.enc
+            resp.set_header( 'accept_ranges', b'bytes' )
             # Populate the context
-            c.etag['body'] = open( docfile, 'rb' ).read()
-            c['last_modified'] = h.http_fromdate( stat.st_mtime )
+            c.etag.hashin( info.token )
+            c['last_modified'] = info.last_modified
+            c['docfile'] = docfile
             cc = ('public,max-age=%s' % str(self['max_age']) ).encode('utf-8')
             resp.set_header( 'cache_control', cc )
+            # Send partial content, if requested.
+            ranges = byteranges( request, c, info.size, self['max_ranges'] )
+            if ranges is not None :
+                resp.content_coding = info.enc  # Ranges of document as it is.
+                sendranges( self, request, info, ranges )
+                return
+            gzinfo = precompressed( self, request, info )
+            if gzinfo :
+                c['precompressed'] = True
+                c['body'] = docbody( self, request, gzinfo )
+            else :
+                c['body'] = docbody( self, request, info )
             # Send Response
             resp.write( c['body'] )
             resp.flush( finishing=True )
         else :
-            resp.pa.logdebug( "Not found %r" % docfile )
+            resp.pa.logdebug( "Not found %r", (docfile,), name='docroot' )
             resp.set_status( b'404' )
             resp.flush( finishing=True )
 
@@ -72,6 +86,13 @@ class DocRootView( Plugin ):
     @classmethod
     def normalize_settings( cls, sett ):
         sett['max_age'] = h.asint( sett['max_age'] )
+        sett['max_ranges'] = h.asint( sett['max_ranges'] )
+        sett['range_window'] = h.asint( sett['range_window'] )
+        sett['doccache_size'] = h.asint( sett['doccache_size'] )
+        sett['doccache_content'] = h.asint( sett['doccache_content'] )
+        sett['missing_size'] = h.asint( sett['missing_size'] )
+        sett['stat_interval'] = h.asfloat( sett['stat_interval'] )
+        sett['fdcache_size'] = h.asint( sett['fdcache_size'] )
         return sett
 
 
@@ -83,4 +104,44 @@ _default_settings['max_age']  = {
     'types'   : (int,),
     'help'    : "How long this file can remain fresh in a HTTP cache."
 }
-
+_default_settings['max_ranges']  = {
+    'default' : 16,
+    'types'   : (int,),
+    'help'    : "Maximum number of byte-ranges, in a Range request, to be "
+                "answered with partial content."
+}
+_default_settings['range_window']  = {
+    'default' : 256 * 1024,
+    'types'   : (int,),
+    'help'    : "Partial content is read and flushed in windows of these many "
+                "bytes."
+}
+_default_settings['doccache_size']  = {
+    'default' : 32 * 1024 * 1024,
+    'types'   : (int,),
+    'help'    : "Maximum size, in bytes, of documents' content and meta-data "
+                "to be cached in memory."
+}
+_default_settings['doccache_content']  = {
+    'default' : 64 * 1024,
+    'types'   : (int,),
+    'help'    : "Content of documents not larger than these many bytes are "
+                "cached in memory."
+}
+_default_settings['missing_size']  = {
+    'default' : 4096,
+    'types'   : (int,),
+    'help'    : "Maximum number of missing documents to be remembered."
+}
+_default_settings['stat_interval']  = {
+    'default' : 2.0,
+    'types'   : (float,),
+    'help'    : "Cached documents are revalidated against the file system, "
+                "not more than once for these many seconds."
+}
+_default_settings['fdcache_size']  = {
+    'default' : 128,
+    'types'   : (int,),
+    'help'    : "Maximum number of file descriptors, of large documents, to "
+                "be kept open."
+}
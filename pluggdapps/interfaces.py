@@ -35,6 +35,11 @@ class IConfigDB( Interface ):
         """Get or set configuration parameter for platform. For more
         information refer to corresponding plugin's documentation."""
 
+    def configs( netpaths ):
+        """Return a dictionary of netpath and its configuration, as returned
+        by :meth:`config` for ``netpath`` keyword, for all ``netpaths`` in
+        one go."""
+
     def close():
         """Reverse of :meth:`connect`."""
 
@@ -398,5 +403,19 @@ class ITemplate( Interface ):
             Dictionary like context object. Typically populated by
             :class:`IHTTPResource` and view-callable, made 
             availabe inside HTML templates.
+
+        If plugin supports :meth:`compile`, callers can pass the compiled
+        template, for ``file``, as ``template`` key-word argument.
         """
 
+    def compile( file ):
+        """Optional method. Compile template ``file``, an absolute file
+        path, and return the compiled template, an object opaque to the
+        caller, which can be passed back to :meth:`render`. Plugins can
+        persist the compiled artefact, so that templates can be compiled at
+        deploy time.
+
+        pluggdapps does not ship a template plugin implementing this method,
+        templates are cached and precompiled only when the configured
+        renderer plugin, from an external package, implements it."""
+
@@ -151,9 +151,9 @@ will override settings from the master-ini-file.
 """
 
 from   configparser          import SafeConfigParser
-from   os.path               import dirname, isfile, abspath
+from   os.path               import dirname, isfile, abspath, join
 from   copy                  import deepcopy
-import re
+import re, os, sys, weakref, pickle, hashlib, logging, inspect
 
 from   pluggdapps.const      import SPECIAL_SECS, URLSEP
 from   pluggdapps.interfaces import IWebApp, IConfigDB
@@ -161,6 +161,11 @@ import pluggdapps.utils      as h
 
 SPECIAL_SECTIONS = ['DEFAULT', 'pluggdapps']
 
+LOGLEVELS = { 'debug' : logging.DEBUG, 'info' : logging.INFO,
+              'warn' : logging.WARNING, 'error' : logging.ERROR }
+"""Log levels supported by platform logging, and their equivalent levels in
+stdlib's logging module."""
+
 def DEFAULT():
     """Global default settings that are applicable to all plugins and
     sections, and can be overriden by base configuration file's 'DEFAULT'
@@ -201,6 +206,22 @@ def pluggdapps_defaultsett():
                       "file.",
         'webconfig' : False,
     }
+    sett['fragments.maxsize'] = {
+        'default'   : 16*1024*1024,
+        'types'     : (int,),
+        'help'      : "Maximum size, in bytes, of page fragments cached by "
+                      "Context.cached() in memory. Can be modified only in "
+                      "the .ini file.",
+        'webconfig' : False,
+    }
+    sett['fragments.ttl'] = {
+        'default'   : 0,
+        'types'     : (int,),
+        'help'      : "Default time-to-live, in seconds, for page fragments "
+                      "cached by Context.cached(). Zero means never expire. "
+                      "Can be modified only in the .ini file.",
+        'webconfig' : False,
+    }
     sett['host'] = {
         'default'   : 'localhost',
         'types'     : (str,),
@@ -215,12 +236,58 @@ def pluggdapps_defaultsett():
         'help'      : "File name to log messages. Make sure to add `file` in "
                       "`logging.output` parameter."
     }
+    sett['logging.queue_size'] = {
+        'default' : 10000,
+        'types'   : (int,),
+        'help'    : "Maximum number of log messages pending to be written to "
+                    "log file. Further messages are dropped and counted, "
+                    "instead of blocking the caller."
+    }
+    sett['logging.flush_interval'] = {
+        'default' : 1.0,
+        'types'   : (float,),
+        'help'    : "Pending log messages are written to log file, in a "
+                    "batch, every these many seconds."
+    }
+    sett['logging.max_bytes'] = {
+        'default' : 0,
+        'types'   : (int,),
+        'help'    : "Rotate log file when it grows beyond these many bytes. "
+                    "Zero means no size based rotation."
+    }
+    sett['logging.rotate_interval'] = {
+        'default' : 0,
+        'types'   : (int,),
+        'help'    : "Rotate log file every these many seconds. Zero means no "
+                    "time based rotation."
+    }
+    sett['logging.backups'] = {
+        'default' : 5,
+        'types'   : (int,),
+        'help'    : "Number of rotated log files to keep."
+    }
+    sett['logging.level'] = {
+        'default' : 'debug',
+        'types'   : (str,),
+        'help'    : "Log messages below this level are ignored. Note that "
+                    "debug messages are logged only in debug mode.",
+        'options' : [ 'debug', 'info', 'warn', 'error' ],
+    }
+    sett['logging.levels'] = {
+        'default' : '',
+        'types'   : (str,),
+        'help'    : "Comma separated list of <name>=<level> to override "
+                    "``logging.level`` for log messages from subsystem "
+                    "<name>, like `web.server=warn`.",
+    }
     sett['logging.output'] = {
         'default' : 'console',
         'types'   : (str,),
         'help'    : "Comma separated value of names to log messages. "
-                    "Supported names are `console`, `file`.",
-        'options' : [ 'console', 'file' ],
+                    "Supported names are `console`, `file`, `logging`. "
+                    "`logging` forwards messages to stdlib's logging module "
+                    "using logger `pluggdapps.<name>`.",
+        'options' : [ 'console', 'file', 'logging' ],
     }
     sett['port'] = {
         'default'   : 8080,
@@ -231,6 +298,18 @@ def pluggdapps_defaultsett():
                       "file.",
         'webconfig' : False,
     }
+    sett['snapshot'] = {
+        'default'   : '',
+        'types'     : (str,),
+        'help'      : "File to save a snapshot of normalized settings, loaded "
+                      "from plugin defaults and ini file, so that they are "
+                      "not re-computed on every boot. Snapshot is discarded "
+                      "when ini file, installed packages or plugins' default "
+                      "settings change. Relative paths are resolved with "
+                      "respect to the ini file. Can be modified only in the "
+                      ".ini file.",
+        'webconfig' : False,
+    }
     sett['scheme'] = {
         'default'   : 'http',
         'types'     : (str,),
@@ -246,10 +325,34 @@ def pluggdapps_defaultsett():
 def normalize_pluggdapps( sett ):
     """Normalize settings for [pluggdapps] special section."""
     sett['port'] = h.asint( sett['port'] )
+    sett['fragments.maxsize'] = h.asint( sett['fragments.maxsize'] )
+    sett['fragments.ttl'] = h.asint( sett['fragments.ttl'] )
+    sett['logging.queue_size'] = h.asint( sett['logging.queue_size'] )
+    sett['logging.flush_interval'] = h.asfloat( sett['logging.flush_interval'] )
+    sett['logging.max_bytes'] = h.asint( sett['logging.max_bytes'] )
+    sett['logging.rotate_interval'] = h.asint( sett['logging.rotate_interval'] )
+    sett['logging.backups'] = h.asint( sett['logging.backups'] )
     if isinstance( sett['logging.output'], str ):
         sett['logging.output'] = h.parsecsv( sett['logging.output'] )
+    sett['logging.level'] = _loglevel( sett['logging.level'] )
+    if isinstance( sett['logging.levels'], str ):
+        levels = {}
+        for nl in h.parsecsv( sett['logging.levels'] ) :
+            if '=' not in nl :
+                raise Exception( "logging.levels entry %r is not of the form "
+                                 "<name>=<level>" % nl )
+            name, level = nl.split( '=', 1 )
+            levels[ name.strip() ] = _loglevel( level )
+        sett['logging.levels'] = levels
     return sett
 
+def _loglevel( level ):
+    level = level.strip().lower()
+    if level not in LOGLEVELS :
+        raise Exception( "Log level %r is not one of %s" %
+                         ( level, ', '.join( LOGLEVELS.keys() )))
+    return level
+
 def mountloc_defaultsett():
     sett = h.ConfigDict()
     sett.__doc__ = "Mount application settings"
@@ -274,6 +377,16 @@ class Pluggdapps( object ):
     configdb = None
     """:class:`pluggdapps.interfaces.IConfigDB` plugin instance."""
 
+    generation = 0
+    """Generation counter for configuration settings, incremented for every
+    configuration change done via :meth:`config`. Plugins caching values
+    derived from settings can compare this counter to detect staleness."""
+
+    _subscribers = {}
+    """Dictionary of (netpath, section) and weak-set of plugins subscribed
+    for configuration changes. ``netpath`` is `platform` for plugins not
+    under a web-application."""
+
     def __init__( self, erlport=None ):
         self.erlport = erlport # TODO: Document this once bolted with netscale
 
@@ -283,24 +396,44 @@ class Pluggdapps( object ):
         package() entry point for each and every package will be called only
         when callpackages() is called. Since callpackages() need a platform
         context, we first pre-boot the system and then actually boot the 
-        system."""
+        system.
+        
+        Settings are loaded and configuration backend is read only once,
+        here. Settings for plugins created or re-defined by package() entry
+        points are merged afterwards. Return the pre-boot platform
+        instance."""
 
         from pluggdapps import callpackages
+        from pluggdapps.plugin import PluginMeta
 
         pa = Pluggdapps( *args, **kwargs )
+        pa.inifile = baseini
         pa.settings = pa._loadsettings( baseini )
 
         # Configuration from backend store.
         storetype = pa.settings['pluggdapps']['configdb']
-        configdb = pa.qp( pa, IConfigDB, storetype )
-        configdb.dbinit()
-        dbsett = configdb.config()
-        if dbsett :
-            [ pa.settings[section].update(d) for section, d in dbsett.items() ]
+        pa.configdb = pa.qp( pa, IConfigDB, storetype )
+        pa.configdb.dbinit()
+        dbsett = pa.configdb.config() or {}
+        [ pa.settings[section].update(d) for section, d in dbsett.items() ]
 
+        # Logging related settings go under `[pluggdapps]` section
         pa.logsett = h.settingsfor( 'logging.', pa.settings['pluggdapps'] )
+
+        # Default cache backend for page fragments, unless replaced.
+        if isinstance( h.Context.fragments, h.FragmentCache ) :
+            sett = h.settingsfor( 'fragments.', pa.settings['pluggdapps'] )
+            h.Context.fragments = h.FragmentCache(
+                                    maxsize=sett['maxsize'], ttl=sett['ttl'] )
+
+        plugins = { nm : info['cls']
+                    for nm, info in PluginMeta._pluginmap.items() }
         callpackages( pa )
-        return configdb
+        names = [ nm for nm, info in PluginMeta._pluginmap.items()
+                  if plugins.get( nm, None ) is not info['cls'] ]
+        if names :
+            pa._mergeplugins( names, dbsett )
+        return pa
 
 
     #---- Overridable methods.
@@ -311,21 +444,13 @@ class Pluggdapps( object ):
         Return a new instance of this class object. This is the only way to
         create a platform instance.
         """
-        configdb = Pluggdapps._preboot( cls, baseini, *args, **kwargs )
+        prepa = Pluggdapps._preboot( cls, baseini, *args, **kwargs )
 
         pa = cls( *args, **kwargs )
         pa.inifile = baseini
-        pa.settings = pa._loadsettings( baseini )
-        pa.configdb = configdb
-
-        # Configuration from backend store
-        dbsett = pa.configdb.config()
-        if dbsett :
-            [ pa.settings[section].update(d) for section, d in dbsett.items() ]
-
-        # Logging related settings go under `[pluggdapps]` section
-        pa.logsett = h.settingsfor( 'logging.', pa.settings['pluggdapps'] )
-
+        pa.settings = prepa.settings
+        pa.configdb = prepa.configdb
+        pa.logsett = prepa.logsett
         return pa
 
     def start( self ):
@@ -386,26 +511,182 @@ class Pluggdapps( object ):
 
         ``value``,
             If present, this method was invoked for setting configuration
-            ``name`` under ``section``. Optional.
+            ``name`` under ``section``. Optional. Settings are updated with
+            normalized ``value``, refer :meth:`notify`.
         """
         section = kwargs.get( 'section', None )
         name = kwargs.get( 'name', None )
         value = kwargs.get( 'value', None )
         if section and name and value :
-            self.settings[section][name] = value
+            self.settings[section][name] = \
+                    self._normalize( self.settings, section, name, value )
+            rc = self.configdb.config( **kwargs )
+            self.notify( 'platform', section, name, value )
+            return rc
         return self.configdb.config( **kwargs )
 
+    def subscribe( self, plugin, netpath='platform' ):
+        """Subscribe ``plugin`` for changes to its configuration settings,
+        done via :meth:`config`, for application mounted on ``netpath``.
+        Plugin's settings are updated in-place and its
+        :meth:`pluggdapps.plugin.ISettings.onconfig` method is called.
+        Subscribers are held by weak reference, meant for plugins that live
+        longer than a request."""
+        key = ( netpath, h.plugin2sec( plugin.caname ))
+        self._subscribers.setdefault( key, weakref.WeakSet() ).add( plugin )
+
+    def notify( self, netpath, section, name, value ):
+        """Bump :attr:`generation` and notify plugins subscribed for
+        ``section`` under ``netpath`` that configuration ``name`` is changed
+        to ``value``. ``value`` is normalized, like default settings, by
+        normalize_settings() method of plugin's bases in mro() order, before
+        updating plugin's settings."""
+        self.generation += 1
+        for plugin in list( self._subscribers.get( (netpath, section), [] )) :
+            try :
+                plugin[ name ] = self._normalizeby( type(plugin), name, value )
+                plugin.onconfig( name, plugin[ name ] )
+            except :
+                self.logerror( h.print_exc() )
+
     #---- Internal methods.
 
+    def _normalize( self, settings, section, name, value ):
+        """Return ``value`` for configuration ``name`` under ``section``
+        normalized, like it is done while loading ``settings``. Raise
+        exception if ``value`` is invalid."""
+        from pluggdapps.plugin import plugin_info
+
+        if section in SPECIAL_SECTIONS :
+            sett = dict( settings[ section ] )
+            sett[ name ] = value
+            if section == 'DEFAULT' :
+                return normalize_defaults( sett )[ name ]
+            return normalize_pluggdapps( sett )[ name ]
+        elif section.startswith( 'plugin:' ) :
+            cls = plugin_info( h.sec2plugin( section ) )['cls']
+            return self._normalizeby( cls, name, value )
+        return value
+
+    def _normalizeby( self, cls, name, value ):
+        """Normalize ``value`` for configuration ``name``, like default
+        settings, by normalize_settings() method of ``cls``'s bases in mro()
+        order."""
+        sett = dict( DEFAULT().items() )
+        sett[ name ] = value
+        for b in reversed( cls.mro() ) :
+            if not hasattr( b, 'default_settings' ) : continue
+            defaults = dict( b.default_settings().items() )
+            defaults.pop( name, None )  # Configured value overrides.
+            sett.update( defaults )
+            sett = b.normalize_settings( sett )
+        return sett[ name ]
+
     def _loadsettings( self, inifile ):
         """Load ``inifile`` and override the default settings with inifile's
-        configuration. Return them as dictionary of global settings."""
+        configuration. Return them as dictionary of global settings. If
+        ``snapshot`` is configured under [pluggdapps] section, settings are
+        loaded from snapshot as long as it is valid."""
+
+        snapshot = self._snapshotfile( inifile )
+        fingerprint = self._fingerprint( inifile ) if snapshot else None
+        settings = self._loadsnapshot( snapshot, fingerprint )
+        if settings is None :
+            defaults = self._defaultsettings()
+            # Override plugin defaults with configuration from ini-file(s)
+            settings = self._loadini( inifile, defaults )
+            self._savesnapshot( snapshot, fingerprint, settings )
+        return settings
 
-        SPECIAL_SECS = [ 'pluggdapps' ]
-        defaults = self._defaultsettings()
-        # Override plugin defaults with configuration from ini-file(s)
-        return self._loadini( inifile, defaults )
+    def _snapshotfile( self, inifile ):
+        """Return absolute path of settings snapshot configured in
+        ``inifile``, else None."""
+        if not inifile or not isfile( inifile ) : return None
+        here = abspath( dirname( inifile ))
+        cp = SafeConfigParser()
+        cp.read( inifile )
+        if not cp.has_option( 'pluggdapps', 'snapshot' ) : return None
+        snapshot = cp.get( 'pluggdapps', 'snapshot', vars={ 'here' : here } )
+        return join( here, snapshot.strip() ) if snapshot.strip() else None
+
+    def _fingerprint( self, inifile ):
+        """Fingerprint of everything that goes into the settings loaded by
+        :meth:`_loadsettings`, other than ``inifile`` itself. That is,
+        installed pluggdapps packages, default settings of every plugin
+        class and the code normalizing them."""
+        from pluggdapps import papackages
+        from pluggdapps.plugin import PluginMeta
 
+        def hashcode( fn ):
+            code = fn.__code__
+            consts = [ c for c in code.co_consts if not inspect.iscode(c) ]
+            hsh.update( code.co_code + repr( consts ).encode() )
+
+        hsh = hashlib.sha1()
+        for sett in [ DEFAULT(), pluggdapps_defaultsett() ] :
+            hsh.update( repr( sorted( sett.items() )).encode() )
+        [ hashcode( fn ) for fn in [ normalize_defaults, normalize_pluggdapps ]]
+        for pkgname, info in sorted( papackages.items() ) :
+            hsh.update( repr(( pkgname, info['package'].version )).encode() )
+        for name, info in sorted( PluginMeta._pluginmap.items() ) :
+            hsh.update( name.encode() )
+            for b in info['cls'].mro() :
+                if hasattr( b, 'default_settings' ) :
+                    sett = sorted( b.default_settings().items() )
+                    hsh.update( repr( sett ).encode() )
+                if hasattr( b, 'normalize_settings' ) :
+                    hashcode( b.normalize_settings )
+        return ( inifile, hsh.hexdigest() )
+
+    def _loadsnapshot( self, snapshot, fingerprint ):
+        """Return settings from ``snapshot`` file if it was saved with the
+        same ``fingerprint`` and ini file is not modified since, else None.
+        Ini file is said to be modified when its content changes, its
+        modification time is only used to avoid reading the content."""
+        if not snapshot or not isfile( snapshot ) : return None
+        try :
+            d = pickle.load( open( snapshot, 'rb' ))
+        except Exception :
+            return None
+        if d.get( 'fingerprint' ) != fingerprint : return None
+
+        inifile, (stamp, digest) = fingerprint[0], d['inifile']
+        st = os.stat( inifile )
+        if ( st.st_mtime_ns, st.st_size ) != stamp :
+            content = open( inifile, 'rb' ).read()
+            if hashlib.sha1( content ).hexdigest() != digest : return None
+        return d['settings']
+
+    def _savesnapshot( self, snapshot, fingerprint, settings ):
+        """Save ``settings`` in ``snapshot`` file along with
+        ``fingerprint``. Settings that cannot be pickled are not saved."""
+        if not snapshot : return
+        inifile = fingerprint[0]
+        st, content = os.stat( inifile ), open( inifile, 'rb' ).read()
+        d = { 'fingerprint' : fingerprint,
+              'inifile' : ( (st.st_mtime_ns, st.st_size),
+                            hashlib.sha1( content ).hexdigest() ),
+              'settings' : settings,
+            }
+        try :
+            data = pickle.dumps( d )
+        except Exception :
+            return
+        tmpfile = snapshot + '.tmp'
+        open( tmpfile, 'wb' ).write( data )
+        os.replace( tmpfile, snapshot )  # Atomic, for concurrent boots.
+
+
+    def _mergeplugins( self, names, dbsett ):
+        """Load settings for plugins, by canonical ``names``, that were
+        defined after platform settings were loaded, like dynamic plugins
+        created by package() entry points. Their default settings are
+        overriden with ini file and ``dbsett`` configuration, and merged
+        with platform settings."""
+        settings = self._loadini( self.inifile, self._defaultsettings(names) )
+        for sec in map( h.plugin2sec, names ) :
+            self.settings[ sec ] = settings[ sec ]
+            self.settings[ sec ].update( dbsett.get( sec, {} ))
 
     def _loadini( self, baseini, defaultsett ):
         """Parse master ini configuration file ``baseini`` and ini files
@@ -452,7 +733,7 @@ class Pluggdapps( object ):
             settings[ pluginsec ] = sett
         return settings
 
-    def _defaultsettings( self ):
+    def _defaultsettings( self, names=None ):
         """By now it is expected that all interface specs and plugin
         definitions would have been loaded by loading packages implementing
         them and pluggdapps' plugin meta-classing. This function will collect
@@ -461,6 +742,9 @@ class Pluggdapps( object ):
           { "plugin:<pkgname>.<pluginname>" : default_settings,
              ...
           }
+
+        If ``names`` is supplied, collect default settings only for those
+        plugins, along with special sections.
         """
         from pluggdapps.plugin import PluginMeta
 
@@ -471,11 +755,13 @@ class Pluggdapps( object ):
         defaultsett['pluggdapps'] = deepcopy(default)
         defaultsett['pluggdapps'].update( 
                         dict( pluggdapps_defaultsett().items() ))
+        normalize_pluggdapps( defaultsett['pluggdapps'] )
 
         # Fetch all the default-settings for loaded plugins using `ISettings`
         # interface. Plugin inheriting from other plugins will override its
         # base's default_settings() in cls.mro() order.
         for name, info in PluginMeta._pluginmap.items() :
+            if names is not None and name not in names : continue
             bases = reversed( info['cls'].mro() )
             sett = deepcopy( default )
             for b in bases :
@@ -590,62 +876,94 @@ class Pluggdapps( object ):
 
     #---- platform logging
 
-    def loginfo( self, formatstr, values=[] ):
+    def logenabled( self, level, name=None ):
+        """Return True if messages of ``level``, one of `debug`, `info`,
+        `warn`, `error`, from subsystem ``name`` will be logged. Use this to
+        avoid preparing expensive log messages that will be ignored. Unknown
+        ``level`` is treated as `error`."""
+        level = LOGLEVELS.get( level.lower(), logging.ERROR )
+        if level == logging.DEBUG and self.settings['DEFAULT']['debug'] != True:
+            return False
+        sett = self.logsett
+        threshold = sett['levels'].get( name, sett['level'] ) \
+                        if name else sett['level']
+        return level >= LOGLEVELS.get( threshold, logging.DEBUG )
+
+    def loginfo( self, formatstr, values=[], name=None ):
         """Use this method to log informational messages. The log messages will
         be formated and handled based on the configuration settings from
         ``[pluggdapps]`` section.
+
+        ``values``, tuple or dictionary of values, if supplied, are
+        formatted into ``formatstr`` using python's ``%`` operator, only when
+        the message is logged. ``name`` is the name of subsystem logging the
+        message, like `web.server`.
+
+        Note that ``values`` are no more passed as erlang ``~p`` arguments
+        to erlport. Message is formatted before it is marshalled to erlang,
+        with an empty list of arguments, hence ``formatstr`` shall use
+        python format specifiers.
         """
-        output, erlport = self.logsett['output'], self.erlport
-        if 'cloud' in output and erlport :
-            self.erlport.loginfo( formatstr, values )
-        if 'file' in output and self.logsett['file'] :
-            open( self.logsett['file'], 'a' ).write( formatstr )
-        if 'console' in output :
-            print( formatstr )
-
-    def logdebug( self, formatstr, values=[] ):
+        self._log( 'info', formatstr, values, name )
+
+    def logdebug( self, formatstr, values=[], name=None ):
         """Use this method to log debug messages. The log messages will
         be formated and handled based on the configuration settings from
-        ``[pluggdapps]`` section.
+        ``[pluggdapps]`` section. Arguments are same as :meth:`loginfo`,
+        ``values`` are python ``%`` formatted, even for erlport.
         """
-        if self.settings['DEFAULT']['debug'] != True : return
-
-        output, erlport = self.logsett['output'], self.erlport
-        formatstr = 'DEBUG: ' + formatstr
-        if 'cloud' in output and erlport :
-            self.erlport.logdebug( formatstr, values )
-        if 'file' in output and self.logsett['file'] :
-            open( self.logsett['file'], 'a' ).write( formatstr )
-        if 'console' in output :
-            print( h.colorize( formatstr, color='33' ))
-
-    def logwarn( self, formatstr, values=[] ):
+        self._log( 'debug', formatstr, values, name )
+
+    def logwarn( self, formatstr, values=[], name=None ):
         """Use this method to log warning messages. The log messages will
         be formated and handled based on the configuration settings from
-        ``[pluggdapps]`` section.
+        ``[pluggdapps]`` section. Arguments are same as :meth:`loginfo`,
+        ``values`` are python ``%`` formatted, even for erlport.
         """
-        output, erlport = self.logsett['output'], self.erlport
-        formatstr = 'WARN: ' + formatstr
-        if 'cloud' in output and erlport :
-            self.erlport.logwarn( formatstr, values )
-        if 'file' in output and self.logsett['file'] :
-            open( self.logsett['file'], 'a' ).write( formatstr )
-        if 'console' in output :
-            print( h.colorize( formatstr, color='32' ))
-
-    def logerror( self, formatstr, values=[] ):
+        self._log( 'warn', formatstr, values, name )
+
+    def logerror( self, formatstr, values=[], name=None ):
         """Use this method to log error messages. The log messages will
         be formated and handled based on the configuration settings from
-        ``[pluggdapps]`` section.
+        ``[pluggdapps]`` section. Arguments are same as :meth:`loginfo`,
+        ``values`` are python ``%`` formatted, even for erlport.
         """
-        output, erlport = self.logsett['output'], self.erlport
-        formatstr = 'ERROR: ' + formatstr
-        if 'cloud' in output and erlport :
-            self.erlport.logerror( formatstr, values )
-        if 'file' in output and self.logsett['file'] :
-            open( self.logsett['file'], 'a' ).write( formatstr )
-        if 'console' in output :
-            print( h.colorize( formatstr, color='31' ))
+        self._log( 'error', formatstr, values, name )
+
+    _logprefix = { 'debug' : ('DEBUG: ', '33'), 'info' : ('', None),
+                   'warn' : ('WARN: ', '32'), 'error' : ('ERROR: ', '31') }
+
+    def _log( self, level, formatstr, values, name ):
+        try :
+            if not self.logenabled( level, name ) : return
+
+            if values :
+                values = tuple(values) if isinstance(values, list) else values
+                formatstr = formatstr % values
+            prefix, color = self._logprefix[ level ]
+            output, erlport = self.logsett['output'], self.erlport
+            if 'cloud' in output and erlport :
+                getattr( self.erlport, 'log' + level )( prefix+formatstr, [] )
+            if 'file' in output and self.logsett['file'] :
+                self._logfile().write( prefix + formatstr + '\n' )
+            if 'logging' in output :
+                logger = 'pluggdapps.' + name if name else 'pluggdapps'
+                logging.getLogger( logger ).log( LOGLEVELS[level], formatstr )
+            if 'console' in output :
+                print( h.colorize( prefix + formatstr, color=color )
+                       if color else formatstr )
+        except Exception :
+            # Logging shall not fail the caller.
+            sys.stderr.write( h.print_exc() )
+
+    def _logfile( self ):
+        """Return buffered writer for configured log file."""
+        sett = self.logsett
+        return h.LogFile.open( sett['file'], queue_size=sett['queue_size'],
+                               flush_interval=sett['flush_interval'],
+                               max_bytes=sett['max_bytes'],
+                               rotate_interval=sett['rotate_interval'],
+                               backups=sett['backups'] )
 
 
 
@@ -668,7 +986,13 @@ class Webapps( Pluggdapps ):
     _app_resolve_cache = {}
     """A dictionary map of (netloc, script-path) to Web-application object."""
 
-    _monitoredfiles = []
+    _app_resolve_index = {}
+    """A dictionary map of netloc to script-path trie, built during boot from
+    mounted netpaths. Each trie node is a list of,
+    ``[ webapp, script-path, { path-segment : child-node } ]``. Netloc can be
+    a wildcard subdomain like ``*.example.com``."""
+
+    _monitoredfiles = set()
     """Attribute used in debug mode to collect and monitor files that will be
     modified during developement."""
 
@@ -694,11 +1018,13 @@ class Webapps( Pluggdapps ):
         pa = super().boot( baseini, *args, **kwargs )
         pa.webapps = {}
         pa.appurls = {}
+        pa._app_resolve_index = {}
 
         appsettings = pa._mountapps()
 
         netpaths = [ instkey[1] for instkey, appsett in appsettings.items() ]
         pa.configdb.dbinit( netpaths=netpaths )
+        dbsetts = pa.configdb.configs( netpaths )
 
         # Mount webapp instances for subdomains and scripts.
         for instkey, appsett in appsettings.items() :
@@ -710,14 +1036,16 @@ class Webapps( Pluggdapps ):
             webapp.appsettings = appsett
             # Update with backend configuration.
             [ webapp.appsettings[section].update( d )
-              for section, d in pa.configdb.config( netpath=netpath ).items() ]
+              for section, d in dbsetts.get( netpath, {} ).items() ]
 
             webapp.instkey, webapp.netpath = instkey, None
             pa.webapps[ instkey ] = webapp
             pa.netpaths[ netpath ] = webapp
             pa.appurls[ instkey ] = webapp.baseurl = pa._make_appurl( instkey )
             
-            pa._app_resolve_cache[ h.parse_netpath(netpath) ] = webapp
+            netloc, script = h.parse_netpath( netpath )
+            pa._app_resolve_cache[ (netloc, script) ] = webapp
+            pa._index_app( netloc, script, webapp )
 
             # Resolution mapping for web-applications
             webapp.netpath = netpath
@@ -819,11 +1147,12 @@ class Webapps( Pluggdapps ):
 
         ``value``,
             If present, this method was invoked for setting configuration
-            ``name`` under ``section``. Optional.
+            ``name`` under ``section``. Optional. Settings are updated with
+            normalized ``value``.
         """
         netpath = kwargs.get( 'netpath', None )
         if netpath == None :
-            super().config( **kwargs )
+            return super().config( **kwargs )
         else :
             section = kwargs.get( 'section', None )
             name = kwargs.get( 'name', None )
@@ -833,7 +1162,11 @@ class Webapps( Pluggdapps ):
             else :
                 settings = self.netpaths[ netpath ].appsettings
             if section and name and value :
-                settings[section][name] = value
+                settings[section][name] = \
+                        self._normalize( settings, section, name, value )
+                rc = self.configdb.config( **kwargs )
+                self.notify( netpath, section, name, value )
+                return rc
             return self.configdb.config( **kwargs )
 
     #---- Internal methods
@@ -943,6 +1276,40 @@ class Webapps( Pluggdapps ):
 
         return appurl
 
+    def _index_app( self, netloc, script, webapp ):
+        """Add ``webapp`` mounted on ``netloc`` and ``script`` path to the
+        resolver index."""
+        node = self._app_resolve_index.setdefault( netloc, [None, '', {}] )
+        for seg in filter( None, script.split( URLSEP )) :
+            node = node[2].setdefault( seg, [None, '', {}] )
+        node[0], node[1] = webapp, script
+
+    def _lookup_app( self, host, path ):
+        """Resolve request ``host`` and url ``path`` to a mounted web
+        application. Return a tuple of (webapp, script-path). Exact host
+        names are preferred, followed by host name without `www.` prefix and
+        finally wildcard subdomains, nearest first. Within a host, longest
+        matching script-path wins."""
+        index = self._app_resolve_index
+        if not host : return None, ''
+        root = index.get( host, None )
+        if root is None and host.startswith( 'www.' ) :
+            root = index.get( host[4:], None )
+        if root is None :
+            labels = host.split( '.' )
+            for i in range( 1, len(labels) ) :
+                root = index.get( '*.' + '.'.join( labels[i:] ), None )
+                if root : break
+            else :
+                return None, ''
+
+        node, match = root, root
+        for seg in path.split( URLSEP )[1:] :
+            node = node[2].get( seg, None )
+            if node is None : break
+            match = node if node[0] else match
+        return match[0], match[1]
+
     #---- Query APIs
 
     @staticmethod
@@ -1077,18 +1444,8 @@ class Webapps( Pluggdapps ):
             :class:`IWebApp` plugin instance.
         """
         uriparts = h.parse_url( uri, host=hdrs.get('host', None) )
-        for key, webapp in self._app_resolve_cache.items() :
-            netloc, script = key
-            uri_netloc = ( uriparts['host'][3:]
-                            if uriparts['host'].startswith('www')
-                            else uriparts['host'] )
-            if netloc == uri_netloc :
-                if script in ['/', ''] :
-                    break
-                elif uriparts['path'].startswith( script ) :
-                    uriparts['script'] = script
-                    uriparts['path'] = uriparts['path'][len(script):]
-                    break
-        else :
-            webapp = None
+        webapp, script = self._lookup_app( uriparts['host'], uriparts['path'] )
+        if webapp and script not in ['/', ''] :
+            uriparts['script'] = script
+            uriparts['path'] = uriparts['path'][len(script):]
         return uriparts, webapp
@@ -456,6 +456,13 @@ class ISettings( Interface ):
         Important : This feature is still evolving.
         """
 
+    def onconfig( name, value ):
+        """Called when configuration parameter ``name`` is changed to
+        ``value``, for plugins subscribed via
+        :meth:`pluggdapps.platform.Pluggdapps.subscribe`. Plugin's settings
+        are already updated with normalized ``value``. Override this method
+        to refresh state derived from settings."""
+
 
 class Plugin( PluginBase ):     # Plugin base class implementing ISettings
     """Every plugin must derive from this class.
@@ -529,6 +536,9 @@ class Plugin( PluginBase ):     # Plugin base class implementing ISettings
     def web_admin( cls, settings ):
         return settings
 
+    def onconfig( self, name, value ):
+        pass
+
 class Singleton( Plugin ):
     """If a plugin sub-class inherits from this Singleton class, then query_*
     methods / functions for plugins will always return a singleton instance of
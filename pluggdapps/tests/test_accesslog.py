@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import unittest, tempfile, json, time, os
+
+import pluggdapps.utils          as h
+from   pluggdapps.web.accesslog  import AccessLog
+
+def request( status=b'200', uri=b'/index.html' ):
+    timers = []
+    ioloop = h.Bunch( add_timeout=lambda d, cb : timers.append( cb ) or cb )
+    return h.Bunch(
+        method=b'GET', uri=uri, version=b'HTTP/1.1',
+        receivedat=time.time() - 0.002,
+        headers={ 'referer' : b'http://a.com/"x"',
+                  'user_agent' : b'test', 'x_request_id' : b'rid1' },
+        response=h.Bunch( statuscode=status, bytes_sent=1234 ),
+        httpconn=h.Bunch( address=('127.0.0.1', 4567),
+                          server=h.Bunch( ioloop=ioloop )),
+        timers=timers )
+
+class UnitTest_AccessLog( unittest.TestCase ):
+
+    def accesslog( self, **kwargs ):
+        filename = os.path.join( tempfile.mkdtemp(), 'access.log' )
+        return AccessLog( filename, interval=60, **kwargs )
+
+    def lines( self, log ):
+        log.flush()
+        log._logfile.flush()
+        return open( log.filename ).read().splitlines()
+
+    def test_common( self ):
+        log = self.accesslog( fmt='common' )
+        log.record( request() )
+        line, = self.lines( log )
+        assert line.startswith( '127.0.0.1 - - [' )
+        assert line.endswith( '] "GET /index.html HTTP/1.1" 200 1234' )
+
+    def test_combined( self ):
+        log = self.accesslog( fmt='combined' )
+        log.record( request() )
+        line, = self.lines( log )
+        common, extra = line.split( ' 200 1234 ' )
+        assert common.endswith( '"GET /index.html HTTP/1.1"' )
+        assert extra.startswith( '"http://a.com/\\"x\\"" "test" ' )
+        duration, rid = extra.split()[-2:]
+        assert int( duration ) >= 2000 and rid == 'rid1'
+
+    def test_json( self ):
+        log = self.accesslog( fmt='json' )
+        log.record( request( status=b'404' ))
+        d = json.loads( self.lines( log )[0] )
+        assert d['host'] == '127.0.0.1' and d['method'] == 'GET'
+        assert d['uri'] == '/index.html' and d['status'] == 404
+        assert d['bytes'] == 1234 and d['request_id'] == 'rid1'
+        assert d['referer'] == 'http://a.com/"x"' and d['duration'] > 0
+
+    def test_sample( self ):
+        log = self.accesslog( fmt='common', sample=0.0 )
+        [ log.record( request() ) for i in range( 10 ) ]
+        log.record( request( status=b'500' ))
+        lines = self.lines( log )
+        assert len( lines ) == 1 and '" 500 ' in lines[0]
+
+    def test_flush_on_full( self ):
+        log = self.accesslog( fmt='common', size=3 )
+        req = request()
+        [ log.record( req ) for i in range( 4 ) ]
+        assert log._count == 1      # Full buffer of 3 is flushed.
+        log._logfile.flush()
+        assert len( open( log.filename ).read().splitlines() ) == 3
+        assert len( req.timers ) == 1
+        req.timers[0]()             # Timer flushes the rest.
+        log._logfile.flush()
+        assert len( open( log.filename ).read().splitlines() ) == 4
+
+    def test_rotation( self ):
+        log = self.accesslog( max_bytes=100, rotate_interval=60, backups=2 )
+        assert log._logfile.max_bytes == 100
+        assert log._logfile.rotate_interval == 60
+        assert log._logfile.backups == 2
+
+    def test_shared( self ):
+        log = self.accesslog()
+        assert AccessLog( log.filename )._logfile is log._logfile
+        assert h.LogFile.open( log.filename ) is log._logfile
+        log._logfile.close()
+        assert h.LogFile.open( log.filename ) is not log._logfile
+
+    def test_settings( self ):
+        from pluggdapps.web.webapp import WebApp, _default_settings
+        sett = dict( _default_settings.items() )
+        sett['accesslog_format'] = 'JSON'
+        assert WebApp.normalize_settings( sett )['accesslog_format'] == 'json'
+        for name, value in [ ('accesslog_format', 'apache'),
+                             ('accesslog_buffer', '0'),
+                             ('accesslog_sample', '1.5'),
+                             ('accesslog_sample', '-0.1') ] :
+            sett = dict( _default_settings.items() )
+            sett[ name ] = value
+            self.assertRaises( Exception, WebApp.normalize_settings, sett )
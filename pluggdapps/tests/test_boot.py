@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import unittest, tempfile
+from   os.path  import join
+
+from   pluggdapps                        import loadpackages
+from   pluggdapps.platform               import Pluggdapps, Webapps
+from   pluggdapps.web.gzip               import GZipOutBound
+from   pluggdapps.tests.test_precompress import masterini, docrootini
+
+class UnitTest_Boot( unittest.TestCase ):
+
+    def boot( self, envdir, ini=masterini ):
+        open( join( envdir, 'master.ini' ), 'w' ).write( ini )
+        open( join( envdir, 'docroot.ini' ), 'w' ).write(docrootini % envdir)
+        return Webapps.boot( join( envdir, 'master.ini' ))
+
+    def setUp( self ):
+        loadpackages()
+
+    def snapshots( self ):
+        """Return a list, appended with True for every boot that loaded
+        settings from snapshot, else False."""
+        loaded, loadsnapshot = [], Pluggdapps._loadsnapshot
+        def _loadsnapshot( pa, *args ):
+            settings = loadsnapshot( pa, *args )
+            loaded.append( settings is not None )
+            return settings
+        Pluggdapps._loadsnapshot = _loadsnapshot
+        self.addCleanup( setattr, Pluggdapps, '_loadsnapshot', loadsnapshot )
+        return loaded
+
+    def test_config( self ):
+        pa = self.boot( tempfile.mkdtemp() )
+        webapp, = pa.webapps.values()
+        webapp.startapp()
+        gzip, = [ tr for tr in webapp.out_transformers
+                  if tr.caname == 'pluggdapps.gzipoutbound' ]
+        sec = 'plugin:pluggdapps.gzipoutbound'
+        pa.config( netpath=webapp.netpath, section=sec, name='cache_size',
+                   value='1024' )
+        assert webapp.appsettings[ sec ]['cache_size'] == 1024
+        assert gzip['cache_size'] == 1024 and gzip.cache.maxsize == 1024
+        pa.config( section='pluggdapps', name='logging.backups', value='2' )
+        assert pa.settings['pluggdapps']['logging.backups'] == 2
+
+    def test_snapshot( self ):
+        envdir, loaded = tempfile.mkdtemp(), self.snapshots()
+        ini = masterini.replace(
+                '[pluggdapps]\n', '[pluggdapps]\nsnapshot = settings.pickle\n' )
+        pa = self.boot( envdir, ini )
+        pa = self.boot( envdir, ini )
+        assert loaded == [ False, True ]
+        sec = 'plugin:pluggdapps.gzipoutbound'
+        assert pa.settings[ sec ]['level'] == 6
+
+        # Changed ini file.
+        pa = self.boot( envdir, ini + '\n[%s]\nlevel = 1\n' % sec )
+        assert loaded[-1] == False and pa.settings[ sec ]['level'] == 1
+        pa = self.boot( envdir, ini + '\n[%s]\nlevel = 1\n' % sec )
+        assert loaded[-1] == True and pa.settings[ sec ]['level'] == 1
+
+        # Changed default settings.
+        defaults = GZipOutBound.default_settings()
+        spec = defaults.specifications()['level']
+        defaults['level'] = dict( spec, default=5 )
+        try :
+            pa = self.boot( envdir, ini )
+            assert loaded[-1] == False and pa.settings[ sec ]['level'] == 5
+        finally :
+            defaults['level'] = spec
+
+        self.boot( envdir, ini )
+        self.boot( envdir, ini )
+        assert loaded[-2:] == [ False, True ]
+
+        # Changed normalization of settings.
+        normalize = GZipOutBound.__dict__['normalize_settings']
+        def normalize_settings( cls, sett ):
+            sett = normalize.__func__( cls, sett )
+            sett['level'] = min( sett['level'], 4 )
+            return sett
+        GZipOutBound.normalize_settings = classmethod( normalize_settings )
+        try :
+            pa = self.boot( envdir, ini )
+            assert loaded[-1] == False and pa.settings[ sec ]['level'] == 4
+        finally :
+            GZipOutBound.normalize_settings = normalize
@@ -74,3 +74,102 @@ class UnitTest_Util( unittest.TestCase ):
 
     def test_docstr( self ):
         assert docstr(docstr) == "Return the doc-string for the object."
+
+    def test_lrucache( self ):
+        cache = LRUCache( 10 )
+        assert cache.set( 'a', b'12345' ) == True
+        assert cache.set( 'b', b'1234' ) == True
+        assert cache.get( 'a' ) == b'12345'
+        assert cache.set( 'c', b'123' ) == True   # Evicts 'b'
+        assert 'b' not in cache and 'a' in cache and 'c' in cache
+        assert cache.currsize == 8
+        assert cache.set( 'd', b'12345678901' ) == False
+        assert cache.get( 'b' ) == None
+        assert cache.hits == 1 and cache.misses == 1
+        assert cache.hitratio() == 0.5
+        assert cache.pop( 'a' ) == b'12345' and cache.currsize == 3
+        cache.clear()
+        assert len( cache ) == 0 and cache.currsize == 0
+        evicted = []
+        cache = LRUCache( 2, sizeof=lambda x : 1,
+                          onevict=lambda k, v : evicted.append( k ))
+        cache.set( 'a', 1 ); cache.set( 'b', 2 ); cache.set( 'c', 3 )
+        assert evicted == [ 'a' ]
+        v = [ 3 ]
+        cache.set( 'c', v ); cache.set( 'c', v )    # Replaced, then re-set.
+        cache.pop( 'b' )
+        assert evicted == [ 'a', 'c', 'b' ]
+        cache.clear()
+        assert evicted == [ 'a', 'c', 'b', 'c' ] and cache.currsize == 0
+
+    def test_context_etag( self ):
+        c = Context()
+        assert c.etagout( prefix='res-' ) == ''
+        assert c.etagout( joinwith='x' ) == 'x'
+        c.etag['a'] = 10
+        assert c['a'] == 10
+        digest = c.etag.hashout( prefix='res-' )
+        assert digest.startswith( 'res-' ) and len( digest ) == 36
+        assert c.etagout( prefix='res-' ) == digest
+        assert c.etag.hashout() == ''
+        c.etag.hashin( (1, 2, 3.0) )
+        d1 = c.etag.hashout()
+        c.etag.clear()
+        c.etag.hashin( (1, 2, 4.0) )
+        assert d1 and d1 != c.etag.hashout()
+
+    def test_etag_values( self ):
+        e1, e2 = Context().etag, Context().etag
+        e1['a'] = 1
+        e1['a'] = 2
+        e2['a'] = 2
+        assert e1.hashout() == e2.hashout()
+        assert e1._digests['a'] == e2._digests['a']     # Digested once.
+        info = { 'name' : 'bose' }
+        e1 = Context().etag
+        e1['info'] = info
+        d1 = e1.hashout()
+        info['name'] = 'chakra'
+        assert d1 != e1.hashout()
+        e2 = Context().etag
+        e2['info'] = dict( info )
+        assert e1.hashout() == e2.hashout()
+
+    def test_context_cached( self ):
+        calls = []
+        producer = lambda : calls.append( 1 ) or b'<nav/>'
+        fragments, Context.fragments = Context.fragments, FragmentCache()
+        self.addCleanup( setattr, Context, 'fragments', fragments )
+        c1, c2 = Context(), Context()
+        assert c1.cached( 'nav', 60, producer ) == b'<nav/>'
+        assert c2.cached( 'nav', 60, producer ) == b'<nav/>'
+        assert len( calls ) == 1
+        assert c1.etagout() == c2.etagout() != ''
+        c3 = Context()
+        c3.cached( 'nav', 60, producer, etag=False )
+        assert c3.etagout() == ''
+        Context.fragments.cache.clear()
+        Context().cached( 'side', -1, producer )
+        Context().cached( 'side', -1, producer )
+        assert len( calls ) == 3
+        Context.fragments = FragmentCache( ttl=-1 )  # Default, expired.
+        Context().cached( 'side', None, producer )
+        Context().cached( 'side', None, producer )
+        assert len( calls ) == 5
+
+    def test_logfile( self ):
+        import tempfile, os
+        filename = os.path.join( tempfile.mkdtemp(), 'pa.log' )
+        log = LogFile( filename, queue_size=4, flush_interval=60,
+                       max_bytes=10, backups=2 )
+        with log._lock :    # Hold back the background flush.
+            assert [ log.write( 'line%s\n' % i ) for i in range(5) ] == \
+                   [ True ] * 4 + [ False ]
+        assert log.dropped == 1
+        log.flush()
+        assert open( filename + '.1' ).read() == \
+                'line0\nline1\nline2\nline3\nWARN: 1 log lines dropped\n'
+        log.write( 'after\n' )
+        log.close()
+        assert open( filename ).read() == 'after\n'
+        assert log.write( 'closed\n' ) == False
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import unittest
+
+from   pluggdapps.utils.parsehttp import *
+
+class UnitTest_ParseHTTP( unittest.TestCase ):
+
+    def test_urlparts( self ):
+        parts = parse_url( b'/a/b?x=1' )
+        assert 'query' in parts and 'path' in parts and 'xyz' not in parts
+        assert parts.get( 'query' ) == { b'x' : [ b'1' ] }
+        assert len( parts ) == len( dict( parts )) and 'query' in dict( parts )
+
+    def test_parse_range( self ):
+        assert parse_range( b'bytes=0-9', 100 ) == [ (0, 9) ]
+        assert parse_range( b'bytes=90-', 100 ) == [ (90, 99) ]
+        assert parse_range( b'bytes=-5', 100 ) == [ (95, 99) ]
+        assert parse_range( b'bytes=0-0, 50-500', 100 ) == [(0, 0), (50, 99)]
+        assert parse_range( b'bytes=100-', 100 ) == []
+        assert parse_range( b'bytes=9-3', 100 ) == None
+        assert parse_range( b'items=0-9', 100 ) == None
+        assert parse_range( b'bytes=a-9', 100 ) == None
+        assert parse_range( b'bytes=-5', 0 ) == []
+        assert parse_range( b'bytes=0-', 0 ) == []
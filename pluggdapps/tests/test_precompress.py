@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import unittest, tempfile, argparse, gzip, os
+from   os.path  import join, isfile
+
+from   pluggdapps             import loadpackages
+from   pluggdapps.platform    import Webapps
+from   pluggdapps.interfaces  import ICommand
+
+masterini = """
+[DEFAULT]
+debug = False
+
+[mountloc]
+localhost/docs = pluggdapps.docroot, %(here)s/docroot.ini
+
+[pluggdapps]
+host = localhost
+port = 8080
+
+[plugin:pluggdapps.configsqlite3db]
+url = %(here)s/configdb.sqlite3
+"""
+
+docrootini = """
+[plugin:pluggdapps.docroot]
+rootloc = %s
+"""
+
+class UnitTest_Precompress( unittest.TestCase ):
+
+    def test_booted( self ):
+        loadpackages()
+        envdir = tempfile.mkdtemp()
+        rootloc = join( envdir, 'static' )
+        os.mkdir( rootloc )
+        open( join( rootloc, 'site.css' ), 'w' ).write( 'body {}\n' * 200 )
+        open( join( rootloc, 'tiny.css' ), 'w' ).write( 'p {}\n' )
+        open( join( envdir, 'master.ini' ), 'w' ).write( masterini )
+        open( join( envdir, 'docroot.ini' ), 'w' ).write(docrootini % rootloc)
+
+        # Platform is booted, but web-applications are not started.
+        pa = Webapps.boot( join( envdir, 'master.ini' ))
+        cmd = pa.qp( pa, None, ICommand, 'pluggdapps.precompress' )
+        cmd.handle( argparse.Namespace( netpath=None, level=9, force=False ))
+        assert gzip.open( join( rootloc, 'site.css.gz' )).read() == \
+               open( join( rootloc, 'site.css' ), 'rb' ).read()
+        assert not isfile( join( rootloc, 'tiny.css.gz' ))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import unittest, tempfile
+from   os.path  import join
+
+from   pluggdapps                        import loadpackages
+from   pluggdapps.platform               import Webapps
+from   pluggdapps.web.interfaces         import IHTTPCookie, IHTTPResponse, \
+                                                IHTTPSession
+from   pluggdapps.tests.test_precompress import masterini, docrootini
+import pluggdapps.utils                  as h
+
+class UnitTest_Session( unittest.TestCase ):
+
+    def setUp( self ):
+        loadpackages()
+        envdir = tempfile.mkdtemp()
+        open( join( envdir, 'master.ini' ), 'w' ).write( masterini )
+        open( join( envdir, 'docroot.ini' ), 'w' ).write(docrootini % envdir)
+        pa = Webapps.boot( join( envdir, 'master.ini' ))
+        self.webapp, = pa.webapps.values()
+        self.webapp.startapp()
+        self.cookie = self.webapp.qp( IHTTPCookie, self.webapp['IHTTPCookie'] )
+
+    def request( self, setcookie=None ):
+        """Return a request, and its session, carrying the session-id cookie
+        from ``setcookie`` header line."""
+        cookies = {}
+        if setcookie :
+            cookies = self.cookie.parse_cookies(
+                        { 'cookie' : setcookie.split( ';' )[0] } )
+        getcookie = lambda name : self.cookie.decode_signed_value(
+                        name, cookies[name].value if name in cookies else None )
+        request = h.Bunch( httpconn=h.Bunch( version=b'HTTP/1.1' ),
+                           cookie=self.cookie, get_secure_cookie=getcookie )
+        request.response = self.webapp.qp(
+                IHTTPResponse, self.webapp['IHTTPResponse'], request )
+        session = self.webapp.qp( IHTTPSession, 'pluggdapps.HTTPSession',
+                                  request )
+        return request, session
+
+    def setcookie( self, request ):
+        lines = request.response._header_data( {} ).decode( 'utf-8' )
+        return [ line[12:] for line in lines.split( '\r\n' )
+                 if line.startswith( 'Set-Cookie: ' ) ]
+
+    def test_roundtrip( self ):
+        request, session = self.request()
+        assert session.get( 'user' ) == None
+        session.set( 'user', 'bose' )
+        session.save()
+        setcookie, = self.setcookie( request )
+        assert setcookie.startswith( 'pasession=' ) and 'HttpOnly' in setcookie
+
+        # Session is loaded back, and modifying it re-issues the cookie.
+        request, session = self.request( setcookie )
+        assert session.get( 'user' ) == 'bose'
+        assert self.setcookie( request ) == []
+        session.set( 'user', 'chakra' )
+        session.save()
+        setcookie, = self.setcookie( request )
+        request, session = self.request( setcookie )
+        assert session.get( 'user' ) == 'chakra'
+
+        # Unsigned or tampered cookie does not load the session.
+        request, session = self.request( 'pasession=' + session.sessionid )
+        assert session.get( 'user' ) == None
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+import unittest, tempfile, time, os
+
+import pluggdapps.utils           as h
+import pluggdapps.web.staticview  as sv
+from   pluggdapps.web.staticview  import byteranges, sendranges, fingerprints, \
+                                         refingerprint
+
+def request( **headers ):
+    response = h.Bunch( headers={}, statuscode=b'200', flushes=[] )
+    response.set_status = lambda code : setattr( response, 'statuscode', code )
+    response.set_header = lambda n, v : response.headers.__setitem__( n, v )
+    response.write = lambda data : None
+    response.flush = lambda finishing=False, callback=None : \
+                        response.flushes.append( (finishing, callback) )
+    return h.Bunch( method=b'GET', headers=headers, response=response )
+
+class UnitTest_StaticView( unittest.TestCase ):
+
+    def test_byteranges( self ):
+        c = h.Context()
+        c['last_modified'] = h.http_fromdate( time.time() - 100 )
+        c.etag.hashin( (1, 2, 3) )
+        req = request( range=b'bytes=0-9' )
+        assert byteranges( req, c, 100, 16 ) == [ (0, 9) ]
+        # Conditional GET answered with `304 Not Modified`, not with ranges.
+        req = request( range=b'bytes=0-9',
+                       if_modified_since=h.http_fromdate( time.time() ))
+        assert byteranges( req, c, 100, 16 ) == None
+        req = request( range=b'bytes=0-9', if_none_match=b'*' )
+        assert byteranges( req, c, 100, 16 ) == None
+        req = request( range=b'bytes=-5' )
+        assert byteranges( req, c, 0, 16 ) == []
+
+    def test_sendranges_304( self ):
+        plugin = { 'range_window' : 4 }
+        info = h.Bunch( size=100 )
+        req = request()
+        resp = req.response
+        resp.media_type = 'text/plain'
+        docread, sv.docread = sv.docread, lambda p, i, n, offset : b'x' * n
+        try :
+            sendranges( plugin, req, info, [ (0, 9) ] )
+            finishing, callback = resp.flushes[-1]
+            assert resp.statuscode == b'206' and callback
+            resp.statuscode = b'304'    # Answered while flushing.
+            callback()
+            assert resp.flushes[-1] == ( True, None )
+        finally :
+            sv.docread = docread
+
+    def test_refingerprint( self ):
+        rootloc = tempfile.mkdtemp()
+        docfile = os.path.join( rootloc, 'site.css' )
+        open( docfile, 'w' ).write( 'body {}\n' )
+        manifest = fingerprints( rootloc )
+        fppath = manifest.forward['site.css']
+        path, token = manifest.reverse[ fppath ]
+        assert path == 'site.css'
+        assert refingerprint( manifest, path, h.Bunch( token=token )) == False
+        open( docfile, 'w' ).write( 'body { margin: 0 }\n' )
+        st = os.stat( docfile )
+        token = (st.st_ino, st.st_size, st.st_mtime)
+        info = h.Bunch( docfile=docfile, token=token )
+        assert refingerprint( manifest, path, info ) == True
+        assert manifest.forward['site.css'] != fppath
+        assert manifest.reverse[ manifest.forward['site.css'] ][1] == token
+        assert manifest.reverse[ fppath ][0] == 'site.css'  # Old url resolves
@@ -10,9 +10,10 @@
 #   * Improve function asbool() implementation.
 
 import sys, os, fcntl, multiprocessing, random, io, traceback, hashlib, \
-       time, imp
+       time, imp, threading, atexit
 from   os.path  import isfile, join
 from   binascii import hexlify
+from   collections import OrderedDict, deque
 
 __all__ = [
     'sourcepath', 'parsecsv', 'parsecsvlines', 'classof', 'subclassof',
@@ -23,7 +24,7 @@ __all__ = [
     'str2module', 'locatefile', 'hitch', 'hitch_method', 'colorize', 'strof',
     'longest_prefix', 'dictsort', 'formated_filesize', 'age', 'pynamespace',
     # Classes
-    'Context', 'Bunch',
+    'Context', 'Bunch', 'LRUCache', 'FragmentCache', 'LogFile',
 ]
 
 ver_int = int( str(sys.version_info[0]) + str(sys.version_info[1]) )
@@ -395,49 +396,70 @@ class ETag( dict ):
       * Passes the key,value pairs assigned or updated on this object to the
         containing ``context`` object.
       * All the key,value pairs assigned or updated to this object will be
-        used to compute ETag value.
+        used to compute ETag value, using blake2b algorithm. Immutable
+        values are digested as and when they are assigned, and the digest
+        is kept per key, so that re-assigning a key replaces its digest.
+        Mutable values, like dictionaries and lists, are digested when
+        :meth:`hashout` is called, so that mutations are accounted for.
       * Optionally, programs can use :meth:`hashin` to compute resource's
         hash-digest outside the context object, but nevertheless contribute to
         ETag computation.
     """
 
+    digest_size = 16
+    """Size of hash-digest in bytes."""
+
+    immutables = ( bytes, str, int, float, bool, type(None) )
+    """Types of values that are digested when assigned."""
+
     def __init__( self, context, *args, **kwargs ):
         """Override dict.__init__ to initalize internal data strucutres."""
-        super().__init__( *args, **kwargs )
+        super().__init__()
         self._c = context
         self._init()
+        self.update( *args, **kwargs )
 
     def __setitem__( self, key, value ):
         """Override to populate the context object with key,value."""
         self._c[ key ] = value
+        immutable = isinstance( value, self.immutables )
+        self._digests[ key ] = self._digest( value ) if immutable else None
         return super().__setitem__( key, value )
 
     def update( self, *args, **kwargs ):
         """Override to populate the context object with *args and **kwargs."""
-        self._c.update( *args, **kwargs )
-        return super().update( *args, **kwargs )
+        [ self.__setitem__( k, v ) for k, v in dict(*args, **kwargs).items() ]
 
     def setdefault( self, key, value=None ):
         """Override to populate the context object with key, value."""
-        self._c.setdefault( key, value )
-        return super().setdefault( key, value )
+        if key not in self :
+            self.__setitem__( key, value )
+        return self[ key ]
 
     def hashin( self, hashstring ):
         """Resource objects for which etag computation and their context
         representations are different can generate hash-digest seperately and
-        update them with rest of the hash-digest through this method."""
-        self._hashin += hashstring.encode('utf-8') \
-                            if isinstance(hashstring, str) else hashstring
+        update them with rest of the hash-digest through this method. 
+        
+        Instead of hashing the entire resource, ``hashstring`` can also be a
+        version token or a tuple like (inode, size, mtime) identifying the
+        resource, in which case its repr() is hashed."""
+        if isinstance( hashstring, str ) :
+            hashstring = hashstring.encode('utf-8')
+        elif not isinstance( hashstring, bytes ) :
+            hashstring = repr( hashstring ).encode('utf-8')
+        self._hashin.update( hashstring )
+        self._hashed = True
 
     def hashout( self, prefix='', joinwith='', sep=';' ):
         """Return the hash digest so far."""
         digest = '' # Initialize
-        if self.values() or self._hashin :
-            [ self._hasher.update(
-                v if isinstance(v, bytes) else str(v).encode('utf-8') 
-              ) for v in self.values() ]
-            self._hasher.update( self._hashin ) if self._hashin else None
-            digest = prefix + self._hasher.hexdigest()
+        if self.values() or self._hashed :
+            hasher = hashlib.blake2b( digest_size=self.digest_size )
+            [ hasher.update( self._digests.get( k ) or self._digest( v ))
+              for k, v in self.items() ]
+            hasher.update( self._hashin.digest() ) if self._hashed else None
+            digest = prefix + hasher.hexdigest()
         return sep.join( filter( None, [joinwith, digest ]))
 
     def clear( self ):
@@ -447,9 +469,15 @@ class ETag( dict ):
         super().clear()
         self._init()
 
+    def _digest( self, value ):
+        if not isinstance( value, bytes ) :
+            value = str( value ).encode( 'utf-8' )
+        return hashlib.blake2b( value, digest_size=self.digest_size ).digest()
+
     def _init( self ):
-        self._hasher = hashlib.sha1()
-        self._hashin = b''
+        self._digests = {}
+        self._hashin = hashlib.blake2b( digest_size=self.digest_size )
+        self._hashed = False
 
 
 class Context( dict ):
@@ -464,14 +492,88 @@ class Context( dict ):
     _specials = ['last_modified', 'etag']
     """Context key-values having special meanings."""
 
-    etag = {}
-    """Dictionary like object when updated with a (key,value) pair, typically
-    a resource data,  will be used to generate a hash-digest for its value.
-    The key,value pair will also be updated on this Context dictionary."""
-
-    def __init__( self, *args, **kwargs ):
-        super().__init__( *args, **kwargs )
-        self.etag = ETag( self )
+    _etag = None
+
+    fragments = None
+    """Cache backend for :meth:`cached`, shared by all context objects.
+    Defaults to an instance of :class:`FragmentCache`, sized by
+    ``fragments.maxsize`` and ``fragments.ttl`` settings under
+    ``[pluggdapps]`` section. Can be replaced with any object implementing
+    the same ``get()`` and ``set()`` methods."""
+
+    @property
+    def etag( self ):
+        """Dictionary like object when updated with a (key,value) pair,
+        typically a resource data,  will be used to generate a hash-digest for
+        its value. The key,value pair will also be updated on this Context
+        dictionary. Created when accessed for the first time."""
+        if self._etag is None :
+            self._etag = ETag( self )
+        return self._etag
+
+    def etagout( self, prefix='', joinwith='', sep=';' ):
+        """Return the hash-digest computed so far by :attr:`etag`, using
+        :meth:`ETag.hashout`, and clear it. If :attr:`etag` was never used,
+        return ``joinwith``."""
+        if self._etag is None :
+            return joinwith
+        digest = self._etag.hashout( prefix=prefix, joinwith=joinwith, sep=sep )
+        self._etag.clear()
+        return digest
+
+    def cached( self, key, ttl, producer, etag=True ):
+        """Return the fragment, like a rendered piece of page, cached under
+        ``key`` in :attr:`fragments`. If not cached, or expired, call
+        ``producer()`` and cache its return value for ``ttl`` seconds, None
+        means the cache backend's default time-to-live. If
+        ``etag`` is True, ``key`` and the time when the fragment was produced
+        will contribute to :attr:`etag`, thus the etag changes whenever the
+        fragment is re-produced."""
+        entry = self.fragments.get( key )
+        if entry is None :
+            value = producer()
+            storedat = self.fragments.set( key, value, ttl )
+        else :
+            value, storedat = entry
+        self.etag.hashin( (key, storedat) ) if etag else None
+        return value
+
+
+class FragmentCache( object ):
+    """Default, in-memory, cache backend for :meth:`Context.cached`. A
+    least recently used cache of fragments, bounded by ``maxsize`` bytes,
+    whose entries expire after their time-to-live, ``ttl`` seconds unless
+    specified for the entry."""
+
+    def __init__( self, maxsize=16*1024*1024, ttl=0 ):
+        self.cache = LRUCache( maxsize, sizeof=self._sizeof )
+        self.ttl = ttl
+
+    def get( self, key ):
+        """Return a tuple of (value, storedat) cached for ``key``, where
+        ``storedat`` is the time when the value was cached. Return None if
+        ``key`` is not cached or expired."""
+        entry = self.cache.get( key, None )
+        if entry is None : return None
+        value, storedat, expires = entry
+        if expires and time.time() > expires :
+            self.cache.pop( key )
+            return None
+        return value, storedat
+
+    def set( self, key, value, ttl ):
+        """Cache ``value`` under ``key`` for ``ttl`` seconds, zero or None
+        means never expire, None means default ``ttl``. Return the time
+        when the value was cached."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        self.cache.set( key, (value, now, (now + ttl) if ttl else None) )
+        return now
+
+    @staticmethod
+    def _sizeof( entry ):
+        value = entry[0]
+        return len( value ) if isinstance( value, (bytes, str) ) else 1
 
 
 class Bunch( object ):
@@ -488,3 +590,197 @@ class Bunch( object ):
         return name + '>'
 
 
+class LRUCache( object ):
+    """Least recently used cache of key,value pairs, bounded by the total
+    size of cached values. When the size of cached values exceed
+    ``maxsize``, least recently used entries are evicted. ``sizeof`` is a
+    callable to compute the size of a value, defaults to ``len()``. Optional
+    ``onevict`` callable is called with key and value of every entry that
+    leaves the cache, whether evicted, popped, replaced by another value or
+    cleared, say to release resources held by the value.
+    
+    Cache hits and misses are counted in :attr:`hits` and :attr:`misses`
+    attributes.
+    """
+
+    def __init__( self, maxsize, sizeof=len, onevict=None ):
+        self.maxsize = maxsize
+        self.sizeof = sizeof
+        self.onevict = onevict
+        self.currsize = 0
+        self.hits = self.misses = 0
+        self._data = OrderedDict()  # key -> (value, size)
+
+    def __len__( self ):
+        return len( self._data )
+
+    def __contains__( self, key ):
+        return key in self._data
+
+    def get( self, key, default=None ):
+        """Return the cached value for ``key``, else ``default``."""
+        try :
+            value, _ = self._data[ key ]
+        except KeyError :
+            self.misses += 1
+            return default
+        self._data.move_to_end( key )
+        self.hits += 1
+        return value
+
+    def set( self, key, value, size=None ):
+        """Cache ``value`` under ``key``. Values larger than the cache itself
+        are not cached, in which case return False."""
+        size = self.sizeof( value ) if size is None else size
+        old = self._data.pop( key, None )
+        if old is not None :
+            self.currsize -= old[1]
+            if self.onevict and old[0] is not value :
+                self.onevict( key, old[0] )
+        if size > self.maxsize : return False
+        self._data[ key ] = (value, size)
+        self.currsize += size
+        while self.currsize > self.maxsize :
+            k, (v, s) = self._data.popitem( last=False )
+            self.currsize -= s
+            self.onevict( k, v ) if self.onevict else None
+        return True
+
+    def pop( self, key, default=None ):
+        """Remove ``key`` from cache and return its value, else ``default``."""
+        try :
+            value, size = self._data.pop( key )
+        except KeyError :
+            return default
+        self.currsize -= size
+        self.onevict( key, value ) if self.onevict else None
+        return value
+
+    def clear( self ):
+        """Remove all entries from cache."""
+        data, self._data = self._data, OrderedDict()
+        self.currsize = 0
+        if self.onevict :
+            [ self.onevict( k, v ) for k, (v, s) in data.items() ]
+
+    def hitratio( self ):
+        """Ratio of cache hits to cache lookups, as a float."""
+        total = self.hits + self.misses
+        return (self.hits / total) if total else 0.0
+
+
+class LogFile( object ):
+    """Buffered writer for log file ``filename``. Lines are queued by
+    :meth:`write`, which never blocks the caller, and written in batches by
+    a background thread, every ``flush_interval`` seconds or when the queue
+    is half full. File is kept open and rotated when it grows beyond
+    ``max_bytes``, or every ``rotate_interval`` seconds, keeping ``backups``
+    number of rotated files as `<filename>.1`, `<filename>.2` etc ... Zero
+    disables the corresponding rotation.
+    
+    When more than ``queue_size`` lines are pending, further lines are
+    dropped and counted in :attr:`dropped`, and a line noting the count is
+    written with the next batch.
+
+    Use :meth:`open` to get the writer for a log file, so that everyone
+    logging to the same file shares one writer.
+    """
+
+    dropped = 0
+    """Number of lines dropped since the writer was created."""
+
+    _logfiles = {}
+    """Dictionary of absolute file name and its writer, refer
+    :meth:`open`."""
+
+    @classmethod
+    def open( cls, filename, **kwargs ):
+        """Return writer for ``filename``, creating it with ``kwargs`` if
+        it is not already open. Writers are shared by file name."""
+        key = os.path.abspath( filename )
+        logfile = cls._logfiles.get( key, None )
+        if logfile is None or logfile._closed :
+            logfile = cls._logfiles[ key ] = cls( filename, **kwargs )
+        return logfile
+
+    def __init__( self, filename, queue_size=10000, flush_interval=1.0,
+                  max_bytes=0, rotate_interval=0, backups=5 ):
+        self.filename = filename
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backups = backups
+        self.dropped = self._reported = 0
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._closed = False
+        self._file = open( filename, 'a' )
+        self._rotateat = self._nextrotate()
+        self._thread = threading.Thread( target=self._run, daemon=True )
+        self._thread.start()
+        atexit.register( self.close )
+
+    def write( self, line ):
+        """Queue ``line``, including its line terminator, to be written.
+        Return False if the line is dropped."""
+        if self._closed or len( self._queue ) >= self.queue_size :
+            self.dropped += 1
+            return False
+        self._queue.append( line )
+        if len( self._queue ) >= self.queue_size // 2 :
+            self._event.set()
+        return True
+
+    def flush( self ):
+        """Write queued lines to file and rotate it if required."""
+        with self._lock :
+            if self._file.closed : return
+            lines = [ self._queue.popleft() for i in range(len(self._queue)) ]
+            dropped, self._reported = self.dropped-self._reported, self.dropped
+            if dropped :
+                lines.append( "WARN: %s log lines dropped\n" % dropped )
+            if lines :
+                self._file.write( ''.join( lines ))
+                self._file.flush()
+            self._rotate()
+
+    def close( self ):
+        """Stop background thread, write pending lines and close the
+        file."""
+        if self._closed : return
+        self._closed = True
+        self._event.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+    #-- local methods
+
+    def _run( self ):
+        while not self._closed :
+            self._event.wait( self.flush_interval )
+            self._event.clear()
+            self.flush()
+
+    def _nextrotate( self ):
+        if self.rotate_interval :
+            return time.time() + self.rotate_interval
+        return None
+
+    def _rotate( self ):
+        bysize = self.max_bytes and self._file.tell() >= self.max_bytes
+        bytime = self._rotateat and time.time() >= self._rotateat
+        if not ( bysize or bytime ) : return
+
+        self._file.close()
+        names = [ self.filename ] + [ '%s.%s' % (self.filename, i)
+                                      for i in range( 1, self.backups+1 ) ]
+        for src, dst in reversed( list( zip( names, names[1:] ))) :
+            if isfile( src ) : os.replace( src, dst )
+        self._file = open( self.filename, 'w' if not self.backups else 'a' )
+        self._rotateat = self._nextrotate()
+
+Context.fragments = FragmentCache()
@@ -31,9 +31,9 @@ __all__ = [
     'make_accept', 'parse_accept_charset', 'make_accept_charset',
     'parse_accept_encoding', 'make_accept_encoding',
     'parse_accept_language', 'make_accept_language', 'parse_content_length', 
-    'parse_content_type', 'parse_content_disposition',
+    'parse_range', 'parse_content_type', 'parse_content_disposition',
     #-- Classes
-    'HTTPHeaders',
+    'URLParts', 'HTTPHeaders',
 ]
 
 re_OCTET  = r"*"
@@ -242,8 +242,12 @@ def parse_url( uri, host=None, scheme=None ):
 
     Among these key values,
       * `path` value will be unquoted using urllib.parse.unquote()
-      * `query` value will be unquoted using urllib.parse.parse_qs()
+      * `query` value will be unquoted using urllib.parse.parse_qs(), lazily
+        on first access.
       * and, all values are available as strings.
+
+    Request-target in origin-form, which is the common case, is parsed by
+    partitioning ``uri`` without calling urlsplit().
     
     `Refer to Section 5.2 in RFC 2616.txt`.
     """
@@ -252,23 +256,64 @@ def parse_url( uri, host=None, scheme=None ):
         host, port = host.split( b':', 1 )
     except :
         host, port = host, None
-    r = urlsplit( uri )
     fn = lambda x : x.decode('utf-8') if isinstance(x, bytes) else None
-    kwargs = { 'scheme'   : (r.scheme or scheme),
-               'netloc'   : r.netloc,
-               'host'     : (r.hostname or host),
-               'port'     : (r.port or port),
-               'username' : r.username,
-               'password' : r.password,
-               'fragment' : r.fragment,
-               'script'   : b'',
-             }
-    kwargs = { k : fn(v) for k, v in kwargs.items() }
-    kwargs['path'] = unquote( r.path.decode('utf8') )
-    kwargs['query'] = parse_qs( r.query ) # With default encoding
-    r = UserDict( **kwargs )
+    if uri.startswith( b'/' ) :
+        rest, _, fragment = uri.partition( b'#' )
+        path, _, query = rest.partition( b'?' )
+        kwargs = { 'scheme'   : fn( scheme ),
+                   'netloc'   : '',
+                   'host'     : fn( host ),
+                   'port'     : fn( port ),
+                   'username' : None,
+                   'password' : None,
+                   'fragment' : fn( fragment ),
+                   'script'   : '',
+                 }
+    else :
+        r = urlsplit( uri )
+        path, query = r.path, r.query
+        kwargs = { 'scheme'   : (r.scheme or scheme),
+                   'netloc'   : r.netloc,
+                   'host'     : (r.hostname or host),
+                   'port'     : (r.port or port),
+                   'username' : r.username,
+                   'password' : r.password,
+                   'fragment' : r.fragment,
+                   'script'   : b'',
+                 }
+        kwargs = { k : fn(v) for k, v in kwargs.items() }
+    path = path.decode('utf8')
+    kwargs['path'] = unquote( path ) if '%' in path else path
+    r = URLParts( **kwargs )
+    r.rawquery = query
     return r
 
+
+class URLParts( UserDict ):
+    """Dictionary of url components returned by :func:`parse_url`. ``query``
+    component is parsed from :attr:`rawquery` only when it is accessed for
+    the first time."""
+
+    rawquery = b''
+    """Byte-string of query component, as found in the request-URL."""
+
+    def __missing__( self, key ):
+        if key == 'query' :
+            self.data['query'] = query = parse_qs( self.rawquery )
+            return query
+        raise KeyError( key )
+
+    def __contains__( self, key ):
+        return key == 'query' or key in self.data
+
+    def __iter__( self ):
+        self[ 'query' ]     # Iterating over all components, parse query.
+        return iter( self.data )
+
+    def __len__( self ):
+        return len( self.data ) + ( 'query' not in self.data )
+
+
 def make_url( baseurl, path, query, fragment ):
     """Using the baseurl and the remaining variable part of a url namely
     path, query, fragment construct a full url that can be sent in response
@@ -844,6 +889,38 @@ def parse_content_length( value ):
     try    : return int(value) if value else value
     except : return None
 
+def parse_range( value, size ):
+    """Parse `Range` request header for an entity of ``size`` bytes, using
+    grammar,::
+
+      Range             = "bytes" "=" 1#( byte-range-spec | suffix-spec )
+      byte-range-spec   = first-byte-pos "-" [ last-byte-pos ]
+      suffix-spec       = "-" suffix-length
+
+    Returns a list of ``(first, last)`` byte positions, both inclusive,
+    clipped to ``size``. Unsatisfiable ranges are skipped, so an empty list
+    means none of the ranges can be satisfied. Returns None if ``value`` is
+    not a valid byte-range specification, in which case the header is to be
+    ignored.
+    """
+    value = value.decode('latin1') if isinstance( value, bytes ) else value
+    unit, _, spec = value.partition( '=' )
+    if unit.strip().lower() != 'bytes' : return None
+
+    ranges = []
+    for rng in filter( None, map( str.strip, spec.split(',') )) :
+        first, dash, last = [ x.strip() for x in rng.partition( '-' ) ]
+        if not dash or not (first or last) : return None
+        if not all( x.isdigit() for x in (first, last) if x ) : return None
+        if first :
+            if last and int(last) < int(first) : return None
+            first, last = int(first), (int(last) if last else size-1)
+            if first < size :
+                ranges.append( (first, min( last, size-1 )) )
+        elif int(last) and size :    # suffix-length
+            ranges.append( (max( size-int(last), 0 ), size-1) )
+    return ranges if spec.strip() else None
+
 def parse_content_type( value ):
     """Parse content type using grammar,::
 
@@ -15,6 +15,7 @@ collection of interfaces required to build the framework. All plugins
 implementing the framework are defined under the package :mod:`pluggdapps.web`.
 """
 
+import pluggdapps.web.accesslog
 import pluggdapps.web.cookie
 import pluggdapps.web.catch_debug
 import pluggdapps.web.gzip
@@ -22,7 +23,9 @@ import pluggdapps.web.httpneg
 import pluggdapps.web.matchrouter
 import pluggdapps.web.request
 import pluggdapps.web.response
+import pluggdapps.web.responsecache
 import pluggdapps.web.server
+import pluggdapps.web.session
 import pluggdapps.web.staticview
 import pluggdapps.web.views
 import pluggdapps.web.webapp
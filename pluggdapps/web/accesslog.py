@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+"""Access log for web-applications. Finished requests are recorded, as
+tuple of raw values, in a preallocated ring buffer, and formatted and
+written in batches, when the buffer is full or periodically. Configure
+``accesslog`` setting of :class:`pluggdapps.web.webapp.WebApp` to enable
+access log."""
+
+import os, sys, time, random, itertools, atexit, json
+
+import pluggdapps.utils as h
+
+__all__ = [ 'AccessLog', 'requestid' ]
+
+_requestids = itertools.count( 1 )
+_prefix = '%x%x' % ( os.getpid(), int( time.time() ))
+
+def _str( o ):
+    """Decode bytes in ``o``, replacing malformed sequences, since request
+    line and headers are supplied by the client."""
+    if isinstance( o, bytes ) : return o.decode( 'utf-8', 'replace' )
+    return str( o )
+
+def requestid( request ):
+    """Return request-id for ``request``, from `X-Request-ID` header if
+    present, else generate one that is unique for this process."""
+    rid = request.headers.get( 'x_request_id', None )
+    if rid : return _str( rid )
+    return '%s-%x' % ( _prefix, next( _requestids ))
+
+
+class AccessLog( object ):
+    """Access log writer for ``filename``. ``fmt`` can be `common` or
+    `combined`, for Common Log Format and Combined Log Format, or `json`
+    for JSON lines. Combined format is suffixed with request duration, in
+    microseconds, and request-id. JSON lines has all of them.
+
+    Requests are recorded in a ring buffer of ``size`` entries, which is
+    flushed when it is full or when ``interval`` seconds have elapsed since
+    the last flush. A timer is kept on the server's event loop while there
+    are recorded requests, so that they are flushed even if no further
+    requests arrive. If ``sample`` is less than 1.0 only that fraction of
+    requests are recorded, while server errors are always recorded.
+
+    Key-word arguments ``kwargs`` are passed on to :meth:`h.LogFile.open`,
+    like ``max_bytes``, ``rotate_interval`` and ``backups`` to rotate log
+    file. Log file writer is shared with anyone else logging to the same
+    file.
+    """
+
+    formats = [ 'common', 'combined', 'json' ]
+    """Supported access log formats."""
+
+    def __init__( self, filename, fmt='combined', size=1024, interval=1.0,
+                  sample=1.0, **kwargs ):
+        self.filename = filename
+        self.format = getattr( self, '_' + fmt )
+        self.size = size
+        self.interval = interval
+        self.sample = sample
+
+        self._ring = [ None ] * size
+        self._count = 0
+        self._flushedat = time.time()
+        self._timer = None
+        self._logfile = h.LogFile.open( filename, **kwargs )
+        atexit.register( self.flush )
+
+    def record( self, request ):
+        """Record finished ``request``."""
+        resp = request.response
+        status = resp.statuscode if resp else b'-'
+        if self.sample < 1.0 and status < b'500' and \
+                random.random() >= self.sample :
+            return
+
+        now = time.time()
+        headers = request.headers
+        address = request.httpconn.address
+        self._ring[ self._count ] = (
+            address[0] if isinstance( address, tuple ) else address,
+            now, request.method, request.uri, request.version, status,
+            resp.bytes_sent if resp else 0, now - request.receivedat,
+            requestid( request ),
+            headers.get( 'referer', b'-' ), headers.get( 'user_agent', b'-' ))
+        self._count += 1
+        if self._count >= self.size or now - self._flushedat >= self.interval :
+            self.flush()
+        elif self._timer is None :
+            ioloop = request.httpconn.server.ioloop
+            self._timer = ioloop.add_timeout( now+self.interval, self._ontimer )
+
+    def flush( self ):
+        """Format recorded requests and write them to log file."""
+        count, self._count = self._count, 0
+        self._flushedat = time.time()
+        if count :
+            self._logfile.write(
+                ''.join( self.format( e ) for e in self._ring[:count] ))
+
+    #-- local methods
+
+    def _ontimer( self ):
+        self._timer = None
+        try :
+            self.flush()
+        except Exception :  # Timer callbacks must handle their exceptions.
+            sys.stderr.write( h.print_exc() )
+
+    _dates = [ None, '' ]
+
+    def _date( self, t ):
+        """Common log format timestamp, memoized for current second."""
+        second = int( t )
+        if self._dates[0] != second :
+            self._dates = [ second,
+                            time.strftime( '%d/%b/%Y:%H:%M:%S %z',
+                                           time.localtime( second )) ]
+        return self._dates[1]
+
+    def _common( self, e ):
+        host, t, method, uri, version, status, nbytes = e[:7]
+        return '%s - - [%s] "%s %s %s" %s %s\n' % (
+                    host, self._date(t), _str(method), _str(uri),
+                    _str(version), _str(status), nbytes or '-' )
+
+    def _combined( self, e ):
+        duration, rid, referer, useragent = e[7:]
+        referer = _str( referer ).replace( '"', '\\"' )
+        useragent = _str( useragent ).replace( '"', '\\"' )
+        return '%s "%s" "%s" %d %s\n' % (
+                    self._common( e )[:-1], referer, useragent,
+                    duration * 1000000, rid )
+
+    def _json( self, e ):
+        host, t, method, uri, version, status, nbytes, duration, rid, \
+            referer, useragent = e
+        return json.dumps({
+            'host' : host, 'time' : t, 'method' : _str(method),
+            'uri' : _str(uri), 'version' : _str(version),
+            'status' : int(status) if status.isdigit() else None,
+            'bytes' : nbytes, 'duration' : duration, 'request_id' : rid,
+            'referer' : _str(referer), 'user_agent' : _str(useragent),
+        }) + '\n'
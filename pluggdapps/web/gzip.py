@@ -5,8 +5,8 @@
 #       Copyright (c) 2011 R Pratap Chakravarthy
 
 
-import gzip
-from   io   import BytesIO
+import zlib, threading
+from   concurrent.futures import ThreadPoolExecutor
 
 import pluggdapps.utils          as h
 from   pluggdapps.plugin         import Plugin, implements
@@ -17,32 +17,100 @@ class GZipOutBound( Plugin ) :
     compression technology. Performs gzip encoding if,
     
     * b'gzip' is in ``content_encoding`` response header.
-    * if type in ``content_type`` response header is `text` or `application`.
+    * if type in ``content_type`` response header is one among
+      ``media_types`` setting.
     * if ``content_type`` response header do not indicate that ``data`` is
       already compressed variant.
+    * if response entity is atleast ``min_length`` bytes long, for the
+      first flush.
 
     If ``data`` successfully gets gzipped, then ``etag`` response header value
     is suffixed with b';gzip'.
     
     If gzip encoding is not applied on ``data``, it is made sure that 
     content_encoding response header does not contain b'gzip' value,
+
+    Whenever gzip content-coding is negotiated for the response, whether
+    applied or not, `Accept-Encoding` is added to ``vary`` response header.
+
+    Compression is streamed, a zlib compressor in gzip format is maintained
+    for each response. Data from every flush() call is compressed and
+    flushed with Z_SYNC_FLUSH and the gzip stream is closed when the response
+    is finishing. Thus data from incremental flush() calls are sent as a
+    single gzip member.
+
+    Compressed representation of responses carrying an ``etag`` header are
+    cached in a LRU cache, bounded by ``cache_size`` bytes, keyed by
+    (etag, level). If view-callable populates context with
+    ``precompressed`` as True, response entity is already gzipped, like the
+    ``.gz`` sibling of a static document, and sent as it is.
+
+    Entire response entities larger than ``offload_length`` are compressed
+    in a thread pool, zlib releases the GIL while compressing, and the
+    result is handed back to the event loop. Optionally, when the event
+    loop's lag exceeds ``lag_threshold``, compression level is dropped to
+    ``lag_level``.
+
+    For `304 Not Modified` responses and HEAD requests without entity,
+    nothing is compressed. Length of compressed representation, remembered
+    from a previous GET request of the same etag, is used as content-length
+    for HEAD requests.
     """
 
     implements( IHTTPOutBound )
 
+    cache = None
+    """:class:`pluggdapps.utils.lib.LRUCache` of compressed representation."""
+
+    _executor = None
+    """Thread pool, shared by all instances of this plugin, to offload
+    compression of large response entities."""
+
+    lengths = None
+    """:class:`pluggdapps.utils.lib.LRUCache` of compressed representation's
+    length, used to answer HEAD requests."""
+
+    def __init__( self ):
+        self.cache = h.LRUCache( self['cache_size'] )
+        self.lengths = h.LRUCache( self['length_memo'], sizeof=lambda x : 1 )
+        self.cachelock = threading.Lock()
+
     #---- IHTTPOutBound method APIs
 
     def transform( self, request, data, finishing=True ):
         """:meth:`pluggdapps.web.interfaces.IHTTPOutBound.transform` interface 
         method."""
         resp = request.response
+        gzipper = getattr( resp, '_gzipper', None )
+        if gzipper :
+            return self._gzip( gzipper, data, finishing )
+        elif resp.isstarted() :
+            return data
+
         ctype = resp.headers.get( 'content_type', b'' )
         cenc  = resp.headers.get( 'content_encoding', b'' )
         etag = resp.headers.get( 'etag', b'' )
 
-        # Compress only if content-type is 'text/*' or 'application/*'
+        precompressed = resp.context.get( 'precompressed', False )
+        if precompressed or self._is_gzip_type( cenc, ctype ) :
+            vary_encoding( resp )   # Content-coding is negotiated.
+
+        if resp.statuscode == b'304' :
+            return self._not_modified( request, etag, cenc )
+        elif precompressed :
+            resp.set_header( 'etag', etag[:-1] + b';gzip"' ) if etag else None
+            return data
+        elif request.method == b'HEAD' and not data :
+            return self._head( request, etag, cenc, ctype )
+
+        # Compress only if content-type is one among configured media-types.
         if self._is_gzip( data, cenc, ctype, resp.statuscode ) :
-            data = self._gzip( data )
+            level = self._level( request )
+            if finishing :
+                data = self._gzip_entity( request, etag, data, level )
+            else :
+                resp._gzipper = gzipper = self._compressobj( level )
+                data = self._gzip( gzipper, data, finishing )
             # etag is always double-quoted.
             resp.set_header( 'etag', etag[:-1] + b';gzip"' ) if etag else None
         else :
@@ -53,25 +121,123 @@ class GZipOutBound( Plugin ) :
     #-- local methods
 
     def _is_gzip( self, data, enc, typ, status ):
-        return ( bool(data) and
-                 b'gzip' in enc and
-                 (typ.startswith(b'text/') or 
-                       typ.startswith(b'application/')) and
-                 b'zip' not in typ )
-
-    def _gzip( self, data ):
-        buf = BytesIO()
-        gzipper = gzip.GzipFile( 
-                        mode='wb', compresslevel=self['level'], fileobj=buf)
-        gzipper.write( data )
-        gzipper.close()
-        buf.seek(0)
-        data = buf.getvalue()
-        buf.close()
-        return data
+        if not data or len(data) < self['min_length'] : return False
+        return self._is_gzip_type( enc, typ )
+
+    def _is_gzip_type( self, enc, typ ):
+        if b'gzip' not in enc : return False
+        return compressible( typ, self['media_types'] )
+
+    def _not_modified( self, request, etag, enc ):
+        """For `304 Not Modified` response, entity is not compressed. Keep
+        the etag and content-encoding of the representation that is held
+        by client."""
+        inm = request.headers.get( 'if_none_match', b'' )
+        gzetag = (etag[:-1] + b';gzip"') if etag else b''
+        resp = request.response
+        if gzetag and gzetag in inm :
+            resp.set_header( 'etag', gzetag )
+        else :
+            resp.set_header( 'content_encoding', enc.replace( b'gzip', b'' ))
+        return b''
+
+    def _head( self, request, etag, enc, typ ):
+        """For HEAD requests, whose entity is not generated by the view, use
+        the length of compressed representation remembered from a previous
+        GET request for the same etag."""
+        resp = request.response
+        key = (etag, self._level( request ))
+        with self.cachelock :
+            length = self.lengths.get( key, None ) if etag else None
+        if length is not None and self._is_gzip_type( enc, typ ) :
+            resp.content_length = length
+            resp.set_header( 'etag', etag[:-1] + b';gzip"' )
+        else :
+            resp.set_header( 'content_encoding', enc.replace( b'gzip', b'' ))
+        return b''
+
+    def _level( self, request ):
+        """Compression level to use, based on event loop's lag."""
+        if self['lag_threshold'] :
+            ioloop = request.httpconn.server.ioloop
+            if ioloop.lag > self['lag_threshold'] :
+                return self['lag_level']
+        return self['level']
+
+    def _compressobj( self, level ):
+        """Return a zlib compressor object generating gzip format."""
+        return zlib.compressobj( level, zlib.DEFLATED, 16 + zlib.MAX_WBITS )
+
+    def _gzip( self, gzipper, data, finishing ):
+        """Compress ``data`` using response's ``gzipper`` object. If
+        ``finishing`` close the gzip stream, otherwise sync-flush the
+        compressed data so that it can be sent to the client right away."""
+        if finishing :
+            return gzipper.compress( data ) + gzipper.flush( zlib.Z_FINISH )
+        elif data :
+            return gzipper.compress( data ) + gzipper.flush( zlib.Z_SYNC_FLUSH )
+        return b''
+
+    def _gzip_entity( self, request, etag, data, level ):
+        """Compress the entire response entity ``data``, identified by
+        ``etag``, re-using the compressed representation from cache if
+        available. Return compressed data or a Future if compression is
+        offloaded to thread pool."""
+        key = (etag, level) if etag else None
+        if key and self['cache_size'] :
+            with self.cachelock :
+                gzdata = self.cache.get( key, None )
+            self._report()
+        else :
+            gzdata = None
+
+        if gzdata is None :
+            if self['offload_length'] and \
+               len( data ) >= self['offload_length'] :
+                return self._offloader().submit(
+                            self._compress, key, data, level )
+            else :
+                gzdata = self._compress( key, data, level )
+        return gzdata
+
+    def _compress( self, key, data, level ):
+        """Compress entire ``data`` and cache it under ``key``. Thread
+        safe."""
+        gzdata = self._gzip( self._compressobj( level ), data, True )
+        self._cacheset( key, gzdata )
+        return gzdata
+
+    def _cacheset( self, key, gzdata ):
+        if key :
+            with self.cachelock :
+                self.cache.set( key, gzdata ) if self['cache_size'] else None
+                self.lengths.set( key, len(gzdata) )
+
+    def _report( self ):
+        lookups = self.cache.hits + self.cache.misses
+        if self['cache_report'] and lookups % self['cache_report'] == 0 :
+            self.pa.logdebug(
+                "gzip cache hit ratio %.2f, %s entries, %s bytes", (
+                self.cache.hitratio(), len(self.cache), self.cache.currsize ),
+                name='web.gzip' )
+
+    def _offloader( self ):
+        cls = self.__class__
+        if cls._executor is None :
+            cls._executor = ThreadPoolExecutor( self['offload_workers'] )
+        return cls._executor
 
     #---- ISettings interface methods
 
+    def onconfig( self, name, value ):
+        """:meth:`pluggdapps.plugin.ISettings.onconfig` interface method.
+        Caches are re-created, empty, when their size is configured."""
+        with self.cachelock :
+            if name == 'cache_size' :
+                self.cache = h.LRUCache( value )
+            elif name == 'length_memo' :
+                self.lengths = h.LRUCache( value, sizeof=lambda x : 1 )
+
     @classmethod
     def default_settings( cls ):
         """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
@@ -85,9 +251,43 @@ class GZipOutBound( Plugin ) :
         method.
         """
         sett['level'] = h.asint( sett['level'] )
+        sett['cache_size'] = h.asint( sett['cache_size'] )
+        sett['cache_report'] = h.asint( sett['cache_report'] )
+        sett['length_memo'] = h.asint( sett['length_memo'] )
+        sett['min_length'] = h.asint( sett['min_length'] )
+        sett['media_types'] = [ x.lower()
+                                for x in h.parsecsvlines( sett['media_types'] )]
+        sett['offload_length'] = h.asint( sett['offload_length'] )
+        sett['offload_workers'] = h.asint( sett['offload_workers'] )
+        sett['lag_threshold'] = h.asfloat( sett['lag_threshold'] )
+        sett['lag_level'] = h.asint( sett['lag_level'] )
         return sett
 
 
+def compressible( typ, media_types ):
+    """Whether content of media-type ``typ`` is worth compressing, as per the
+    list of ``media_types`` that may contain `type/*` wildcards."""
+    typ = h.strof( typ )
+    if 'zip' in typ : return False
+    mt = typ.split( ';', 1 )[0].strip().lower()
+    return mt in media_types or ( mt.split( '/', 1 )[0] + '/*' ) in media_types
+
+def accepts_gzip( request ):
+    """Whether ``request``'s `Accept-Encoding` header admits gzip
+    content-coding."""
+    codings = dict( h.parse_accept_encoding(
+                        request.headers.get( 'accept_encoding', b'' )))
+    return codings.get( 'gzip', codings.get( '*', 0.0 )) > 0.0
+
+def vary_encoding( resp ):
+    """Add `Accept-Encoding` to ``resp``'s `Vary` header, so that caches
+    keep the representations of negotiated content-coding apart."""
+    vary = resp.headers.get( 'vary', b'' )
+    if b'accept-encoding' not in vary.lower() :
+        resp.set_header(
+            'vary', b', '.join( filter( None, [vary, b'Accept-Encoding'] )))
+
+
 _default_settings = h.ConfigDict()
 _default_settings.__doc__ = (
     "Out-bound transformer to compress response entity using gzip compression "
@@ -98,4 +298,63 @@ _default_settings['level']  = {
     'types'   : (int,),
     'help'    : "Compression level while applying gzip."
 }
-
+_default_settings['cache_size']  = {
+    'default' : 4 * 1024 * 1024,
+    'types'   : (int,),
+    'help'    : "Maximum size, in bytes, of compressed representations to be "
+                "cached in memory, keyed by response etag. Set this to zero "
+                "to disable the cache."
+}
+_default_settings['cache_report']  = {
+    'default' : 1000,
+    'types'   : (int,),
+    'help'    : "Log the cache hit ratio once for every so many cache "
+                "lookups."
+}
+_default_settings['length_memo']  = {
+    'default' : 10000,
+    'types'   : (int,),
+    'help'    : "Number of compressed representation's length to remember, "
+                "keyed by etag, to answer HEAD requests without compressing."
+}
+_default_settings['min_length']  = {
+    'default' : 256,
+    'types'   : (int,),
+    'help'    : "Response entities smaller than this many bytes are not "
+                "compressed, gzip header and trailer cost more than what is "
+                "saved."
+}
+_default_settings['media_types']  = {
+    'default' : 'text/*, application/json, application/javascript, '
+                'application/x-javascript, application/xml, '
+                'application/xhtml+xml, application/rss+xml, '
+                'application/atom+xml, image/svg+xml',
+    'types'   : ('csv', list),
+    'help'    : "Comma separated list of media types for which response "
+                "entity will be compressed. Type/* matches all subtypes."
+}
+_default_settings['offload_length']  = {
+    'default' : 256 * 1024,
+    'types'   : (int,),
+    'help'    : "Entire response entities of this many bytes or larger are "
+                "compressed in a thread pool, instead of blocking the event "
+                "loop. Set this to zero to always compress in-line."
+}
+_default_settings['offload_workers']  = {
+    'default' : 2,
+    'types'   : (int,),
+    'help'    : "Number of threads in the pool used for offloading "
+                "compression."
+}
+_default_settings['lag_threshold']  = {
+    'default' : 0.0,
+    'types'   : (float,),
+    'help'    : "If event loop's lag, in seconds, exceeds this value, "
+                "compression level is dropped to `lag_level`. Zero disables "
+                "this behaviour."
+}
+_default_settings['lag_level']  = {
+    'default' : 1,
+    'types'   : (int,),
+    'help'    : "Compression level to use when event loop is lagging."
+}
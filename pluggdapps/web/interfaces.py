@@ -176,7 +176,45 @@ class IHTTPCookie( Interface ):
 
 
 class IHTTPSession( Interface ):
-    """Handle cookie based user-sessions."""
+    """Handle cookie based user-sessions. Plugin is instantiated for every
+    request by :class:`IWebApp` and available as
+    :attr:`IHTTPRequest.session`. Only a signed session-id is sent as cookie,
+    session data is stored on the server side."""
+
+    sessionid = None
+    """Session-id, as string, for this request's session. None if the
+    request does not belong to a session yet."""
+
+    dirty = False
+    """Set to True when session data is modified, and hence need to be
+    saved. Programs mutating a value in-place, say a list, must set this
+    attribute explicitly."""
+
+    def __init__( request ):
+        """Instantiate a session plugin for ``request``, plugin implementing
+        :class:`IHTTPRequest` interface. Session data is loaded lazily, when
+        accessed for the first time."""
+
+    def get( name, default=None ):
+        """Return the value of session attribute ``name``, else
+        ``default``."""
+
+    def set( name, value ):
+        """Set session attribute ``name`` to ``value``. If request does not
+        belong to a session, create a new session and set the session-id
+        cookie."""
+
+    def pop( name, default=None ):
+        """Remove session attribute ``name`` and return its value, else
+        ``default``."""
+
+    def invalidate():
+        """Remove the session and its data, and clear the session-id
+        cookie."""
+
+    def save():
+        """Persist session data if it is :attr:`dirty`. Called by
+        :class:`IWebApp` when the request is finished."""
 
 
 class IHTTPRequest( Interface ):
@@ -478,6 +516,33 @@ class IHTTPResponse( Interface ):
     content-encoding header field is normally set in out-bound-transformer
     plugin :class:`ResponseHeaders`."""
 
+    cache_control = None
+    """If route configuration supplies cache_control specification, this
+    attribute will be set with supplied value before calling view-callable.
+    Unless the view-callable sets the cache-control header field by itself,
+    it is set in out-bound-transformer plugin :class:`ResponseHeaders`."""
+
+    response_cache = False
+    """If route configuration enables response_cache, this attribute will be
+    set to True before calling view-callable. Server side response cache
+    will store this response only if this attribute is True."""
+
+    out_transformers = []
+    """List of :class:`IHTTPOutBound` plugins to be applied on this
+    response, initialized from :attr:`IWebApp.out_transformers`. An
+    in-bound transformer answering a request by itself, can empty this list
+    to send the response as it is."""
+
+    content_length = None
+    """Length of response entity, in bytes, when it is known without
+    generating the entity, or when the entity is flushed in parts. If
+    declared, this is used as `Content-Length` header. For HEAD request,
+    written data is not passed through out-bound transformers."""
+
+    bytes_sent = 0
+    """Number of response entity bytes written to the connection so far,
+    excluding headers and chunk framing."""
+
     def __init__( request ):
         """Instantiate a response plugin for a corresponding ``request``
         plugin.
@@ -4,9 +4,10 @@
 # file 'LICENSE', which is part of this source code package.
 #       Copyright (c) 2011 R Pratap Chakravarthy
 
-import re
-from   copy     import deepcopy
-from   os.path  import isfile
+import re, string
+from   copy         import deepcopy
+from   os.path      import isfile
+from   urllib.parse import quote, urlencode
 
 import pluggdapps.utils          as h
 from   pluggdapps.const          import URLSEP, CONTENT_IDENTITY
@@ -21,6 +22,8 @@ from   pluggdapps.web.interfaces import IHTTPRouter, IHTTPResource, IHTTPView, \
 re_patt = re.compile( r'([^{]+)?(\{.+\})?([^}]+)?' )
           # prefix, { interpolater }, suffix
 
+string_formatter = string.Formatter()
+
 class MatchRouter( Plugin ):
     """Plugin to resolve HTTP request to a view-callable by matching patterns
     on request-URL. Refer to :class:`pluggdapps.web.interfaces.IHTTPRouter`
@@ -66,7 +69,10 @@ class MatchRouter( Plugin ):
             'charset'          : <charset-string as string>,
             'content_coding'   : <content-coding as comma separated values>,
             'cache_control'    : <response header value>,
+            'response_cache'   : <boolean>,
+            'conditional'      : <boolean>,
             'rootloc'          : <path to root location for static documents>,
+            'fingerprint'      : <boolean>,
           },
           ...
         ]
@@ -87,12 +93,17 @@ class MatchRouter( Plugin ):
     """:class:`pluggdapps.web.interface.IHTTPNegotiator` plugin to handle HTTP
     negotiation."""
 
+    urlmemo = {}
+    """Dictionary of (view-name, matchdict-items) to url-path, memoized by
+    :meth:`urlpath`."""
+
     def onboot( self ):
         """:meth:`pluggapps.web.interfaces.IHTTPRouter.onboot` interface
         method. Deriving class must override this method and use
         :meth:`add_view` to create router mapping."""
         self.views = {}
         self.viewlist = []
+        self.urlmemo = {}
         self.negotiator = None
         if self['IHTTPNegotiator'] :
             self.negotiator = self.qp(IHTTPNegotiator, self['IHTTPNegotiator'])
@@ -177,11 +188,31 @@ class MatchRouter( Plugin ):
             Cache-Control response header value to be used for the resource's
             variant.
 
+        ``response_cache``,
+            Boolean, if True, cacheable responses for this view will be
+            stored in server side response cache, when configured. Defaults
+            to False.
+
+        ``conditional``,
+            Boolean, if True, etag and last_modified populated by resource
+            callable are final validators for the resource's variant.
+            Conditional GET and HEAD requests are answered with `304 Not
+            Modified` right after calling the resource, without calling the
+            view-callable. Etag contributions from view-callable are
+            ignored. Defaults to False.
+
         ``rootloc``,
             To add views for static files, use this attribute. Specifies the
             root location where static files are located. Note that when using
             this option, ``pattern`` argument must end with ``*path``.
 
+        ``fingerprint``,
+            Boolean, applicable along with ``rootloc``. If True, a manifest of
+            static files and their content-hash is built when adding the
+            view. :meth:`urlpath` will then generate fingerprinted paths, like
+            `app.3f9a2c1b0e.js` for `app.js`, which the view-callable can
+            serve as immutable. Defaults to False.
+
         ``media_type``, ``language``, ``content_coding`` and ``charset``
         kwargs, if supplied, will be used during content negotiation.
         """
@@ -193,6 +224,7 @@ class MatchRouter( Plugin ):
         view['compiled_pattern'] = re.compile( regex )
         view['path_template'] = tmpl
         view['match_segments'] = redict
+        view['url_builder'] = self._compile_builder( name, tmpl, redict )
 
         # Supported key-word arguments
         view['view'] = kwargs.pop( 'view', None )
@@ -204,9 +236,20 @@ class MatchRouter( Plugin ):
         view['content_coding'] = kwargs.pop('content_coding',CONTENT_IDENTITY)
         view['language'] = kwargs.pop( 'language', self.webapp['language'] )
         view['charset'] = kwargs.pop( 'charset', self.webapp['encoding'] )
+        # Caching attributes
+        view['cache_control'] = kwargs.pop( 'cache_control', None )
+        view['response_cache'] = kwargs.pop( 'response_cache', False )
+        view['conditional'] = kwargs.pop( 'conditional', False )
+        view['fingerprint'] = kwargs.pop( 'fingerprint', False )
         
         # Content Negotiation attributes
         view.update( kwargs )
+
+        # Manifest of content-hash for static files.
+        if view['fingerprint'] and view.get( 'rootloc', None ) :
+            from pluggdapps.web.staticview import fingerprints
+            view['fingerprints'] = fingerprints(
+                    h.abspath_from_asset_spec( view['rootloc'] ))
         self.viewlist.append( (name, view) )
 
 
@@ -235,6 +278,11 @@ class MatchRouter( Plugin ):
         generates the etag for data that was populated through ``c.etag``
         dictionary. Populates context with special key `etag` and clears
         ``c.etag`` before sending the context to view-callable.
+
+        If the resolved view is ``conditional``, and the request's
+        If-None-Match or If-Modified-Since header matches the etag or
+        last_modified populated by resource callable, request is answered
+        with `304 Not Modified` without calling the view-callable.
         """
         resp = request.response
         c = resp.context
@@ -255,6 +303,8 @@ class MatchRouter( Plugin ):
             resp.charset = viewd['charset']
             resp.language = viewd['language']
             resp.content_coding = viewd['content_coding']
+            resp.cache_control = viewd['cache_control']
+            resp.response_cache = viewd['response_cache']
             request.matchdict = m.groupdict()
 
             # Call IHTTPResource plugin configured for this view callable.
@@ -262,9 +312,21 @@ class MatchRouter( Plugin ):
             resource( request, c ) if resource else None
 
             # If etag is available, compute and subsequently clear them.
-            etag = c.etag.hashout( prefix='res-' )
+            etag = c.etagout( prefix='res-' )
             c.setdefault( 'etag', etag ) if etag else None
-            c.etag.clear()
+
+            # Validators from resource are final, answer conditional request
+            # without calling the view.
+            if viewd['conditional'] :
+                if c.get( 'etag', None ) :
+                    etag = ('"%s"' % c.pop( 'etag' )).encode( 'utf-8' )
+                    resp.set_header( 'etag', etag )
+                if self._not_modified( request, c ) :
+                    self.pa.logdebug( "%r not modified", (request.uri,),
+                                      name='web.matchrouter' )
+                    resp.set_status( b'304' )
+                    resp.flush( finishing=True )
+                    return
 
             request.view = self._viewof( request, name, viewd )
 
@@ -301,12 +363,33 @@ class MatchRouter( Plugin ):
 
             `_anchor`, its value will be attached at the end of the url as
             "#<_anchor>".
+
+        For static views added with ``fingerprint``, `path` is substituted
+        with its fingerprinted path, if available in the manifest.
         """
-        view = self.views[ name ]
+        try :
+            key = ( name, tuple( sorted( matchdict.items() )))
+            return self.urlmemo[ key ]
+        except KeyError :
+            pass
+        except TypeError :  # Un-hashable values, like `_query` dictionary.
+            key = None
+
         query = matchdict.pop( '_query', None )
         fragment = matchdict.pop( '_anchor', None )
-        path = view['path_template'].format( **matchdict )
-        return h.make_url( None, path, query, fragment )
+        view = self.views[ name ]
+        if view.get( 'fingerprints', None ) and 'path' in matchdict :
+            path = matchdict['path']
+            matchdict['path'] = view['fingerprints'].forward.get( path, path )
+        url = view['url_builder']( matchdict )
+        url += ('?' + urlencode( query )) if query else ''
+        url += ('#' + fragment) if fragment else ''
+
+        if key :
+            if len( self.urlmemo ) >= self['urlmemo_size'] :
+                self.urlmemo.clear()
+            self.urlmemo[ key ] = url
+        return url
 
     def onfinish( self, request ):
         """:meth:`pluggdapps.web.interfaces.IHTTPRouter.onfinish` interface
@@ -319,7 +402,8 @@ class MatchRouter( Plugin ):
     def _viewof( self, request, name, viewd ):
         """For resolved view ``viewd``, fetch the view-callable."""
         v = viewd['view']
-        self.pa.logdebug( "%r view callable: %r " % (request.uri, v) )
+        self.pa.logdebug( "%r view callable: %r ", (request.uri, v),
+                          name='web.matchrouter' )
         if isinstance(v, str) and isplugin(v) :
             view = self.qp( IHTTPView, v, name, viewd )
         elif isinstance( v, str ):
@@ -331,7 +415,8 @@ class MatchRouter( Plugin ):
     def _resourceof( self, request, viewd ):
         """For resolved view ``viewd``, fetch the resource-callable."""
         res = viewd['resource']
-        self.pa.logdebug( "%r resource callable: %r " % (request.uri, res) )
+        self.pa.logdebug( "%r resource callable: %r ", (request.uri, res),
+                          name='web.matchrouter' )
         if isinstance( res, str ) and isplugin( res ) :
             return self.qp( IHTTPResource, res )
         elif isinstance( res, str ) :
@@ -339,6 +424,24 @@ class MatchRouter( Plugin ):
         else :
             return res
 
+    def _not_modified( self, request, c ):
+        """Check whether conditional GET or HEAD ``request`` can be answered
+        with `304 Not Modified` using response's etag header and
+        ``last_modified`` from context ``c``."""
+        if request.method not in (b'GET', b'HEAD') : return False
+
+        inm = request.headers.get( 'if_none_match', b'' ).strip()
+        if inm :    # If-Modified-Since is ignored when If-None-Match is sent
+            etag = request.response.headers.get( 'etag', b'' )
+            return inm == b'*' or bool( etag and etag[:-1] in inm )
+
+        ims = request.headers.get( 'if_modified_since', b'' ).strip()
+        last_modified = c.get( 'last_modified', None )
+        if ims and last_modified :
+            ims, lm = h.parse_date( ims ), h.parse_date( last_modified )
+            return bool( ims and lm and ims >= lm )
+        return False
+
     def _match_url( self, request, viewlist ):
         """Match view pattern with request url and filter out views with
         matching urls."""
@@ -421,8 +524,49 @@ class MatchRouter( Plugin ):
         regex += '$'
         return regex, tmpl, redict
 
+    def _compile_builder( self, name, tmpl, redict ):
+        """Compile path-template ``tmpl`` into a builder function that
+        accepts a matchdict and returns the quoted url-path. Static segments
+        are quoted once, here, while dynamic segments are validated against
+        their regular expression from ``redict`` and quoted during the
+        call."""
+        parts = []
+        for static, field, _, _ in string_formatter.parse( tmpl ) :
+            parts.append( quote( static ) ) if static else None
+            if field :
+                reg = redict.get( field, None )
+                regc = re.compile( r'(?:%s)$' % reg ) if reg else None
+                parts.append( (field, regc) )
+
+        statics = [ isinstance(x, str) for x in parts ]
+        if all( statics ) :
+            path = ''.join( parts )
+            return lambda matchdict : path
+
+        def builder( matchdict ):
+            segs = []
+            for part in parts :
+                if isinstance( part, str ) :
+                    segs.append( part )
+                    continue
+                field, regc = part
+                value = str( matchdict[ field ] )
+                if regc and not regc.match( value ) :
+                    raise ValueError(
+                        "Value %r for %r does not match view %r" % (
+                            value, field, name ))
+                segs.append( quote( value ))
+            return ''.join( segs )
+
+        return builder
+
     #---- ISettings interface methods
 
+    def onconfig( self, name, value ):
+        """:meth:`pluggdapps.plugin.ISettings.onconfig` interface method.
+        Url-paths memoized by :meth:`urlpath` are cleared."""
+        self.urlmemo = {}
+
     @classmethod
     def default_settings( cls ):
         """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
@@ -466,4 +610,11 @@ _default_settings['routemapper'] = {
                 "dictionary element will be converted to add_view() "
                 "method-call on the router plugin."
 }
+_default_settings['urlmemo_size'] = {
+    'default' : 1024,
+    'types'   : (int,),
+    'help'    : "Maximum number of url-paths, generated by urlpath() method, "
+                "to be memoized. When the limit is reached the memo is "
+                "flushed and built afresh."
+}
 
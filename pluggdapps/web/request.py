@@ -24,6 +24,11 @@ class HTTPRequest( Plugin ):
     content_type = ''
     """Parsed content type as return from :meth:`parse_content_type`."""
 
+    # Request cookies, query and form parameters are parsed lazily, when
+    # they are accessed for the first time.
+    _cookies = _getparams = _postparams = _multiparts = _files = None
+    _params = None
+
     # IHTTPRequest interface methods and attributes
     def __init__( self, httpconn, method, uri, uriparts, version, headers ):
         """:meth:`pluggdapps.web.interfaces.IHTTPRequest.__init__` interface
@@ -41,18 +46,6 @@ class HTTPRequest( Plugin ):
         self.body = b''
         self.chunks = []
         self.trailers = {}
-        self.cookies = {}
-
-        # Only in case of POST and PUT method.
-        self.postparams = {}
-        self.multiparts = {}
-        self.files = {}
-
-        # Initialize
-        self.params = {}
-        self.getparams = { h.strof(k) : list( map( h.strof, vs )) 
-                           for k,vs in self.uriparts['query'].items() }
-        self.params.update( self.getparams )
 
         self.content_type = \
                 h.parse_content_type( headers.get( 'content_type', None ))
@@ -98,8 +91,6 @@ class HTTPRequest( Plugin ):
     def handle( self, body=None, chunk=None, trailers=None ):
         """:meth:`pluggdapps.web.interfaces.IHTTPRequest.handle`
         interface method."""
-        self.cookies = self.cookie.parse_cookies( self.headers )
-
         # In case of `chunked` encoding, check whether this is the last chunk.
         finishing = body or ( chunk and trailers and chunk[0] == 0)
 
@@ -115,19 +106,103 @@ class HTTPRequest( Plugin ):
             self.chunks.append( (chunk[0], chunk[1], data) )
         self.trailers = trailers or self.trailers
 
-        # Process POST and PUT request interpreting multipart content.
-        if self.method in ( b'POST', b'PUT' ) :
-            self.postparams, self.multiparts = \
-                    h.parse_formbody( self.content_type, self.body )
-            self.postparams = { h.strof(k) : list( map( h.strof, vs )) 
-                                for k,vs in self.postparams.items() }
-            [ self.params.setdefault( name, [] ).extend( value )
+        # Request body might have changed, parse POST and PUT parameters
+        # afresh when they are accessed.
+        self._postparams = self._multiparts = self._files = None
+        self._params = None
+
+    #-- Lazily parsed request attributes.
+
+    @property
+    def cookies( self ):
+        """:attr:`pluggdapps.web.interfaces.IHTTPRequest.cookies` interface
+        attribute. Parsed on first access."""
+        if self._cookies is None :
+            self._cookies = self.cookie.parse_cookies( self.headers )
+        return self._cookies
+
+    @cookies.setter
+    def cookies( self, value ):
+        self._cookies = value
+
+    @property
+    def getparams( self ):
+        """:attr:`pluggdapps.web.interfaces.IHTTPRequest.getparams` interface
+        attribute. Parsed on first access."""
+        if self._getparams is None :
+            self._getparams = { h.strof(k) : list( map( h.strof, vs ))
+                                for k,vs in self.uriparts['query'].items() }
+        return self._getparams
+
+    @getparams.setter
+    def getparams( self, value ):
+        self._getparams = value
+
+    @property
+    def postparams( self ):
+        """:attr:`pluggdapps.web.interfaces.IHTTPRequest.postparams` interface
+        attribute. Parsed on first access."""
+        if self._postparams is None :
+            self._parse_formbody()
+        return self._postparams
+
+    @postparams.setter
+    def postparams( self, value ):
+        self._postparams = value
+
+    @property
+    def multiparts( self ):
+        """:attr:`pluggdapps.web.interfaces.IHTTPRequest.multiparts` interface
+        attribute. Parsed on first access."""
+        if self._multiparts is None :
+            self._parse_formbody()
+        return self._multiparts
+
+    @multiparts.setter
+    def multiparts( self, value ):
+        self._multiparts = value
+
+    @property
+    def files( self ):
+        """:attr:`pluggdapps.web.interfaces.IHTTPRequest.files` interface
+        attribute. Parsed on first access."""
+        if self._files is None :
+            self._parse_formbody()
+        return self._files
+
+    @files.setter
+    def files( self, value ):
+        self._files = value
+
+    @property
+    def params( self ):
+        """:attr:`pluggdapps.web.interfaces.IHTTPRequest.params` interface
+        attribute. Combined on first access."""
+        if self._params is None :
+            params = { k : list(vs) for k, vs in self.getparams.items() }
+            [ params.setdefault( name, [] ).extend( value )
               for name, value in self.postparams.items() ]
-            [ self.params.setdefault( name, [] ).extend( value )
-              for name, value in self.multiparts.items() ]
-            [ self.files.setdefault( name, [] 
-                                   ).extend( (f['filename'], f['value'] ) )
+            [ params.setdefault( name, [] ).extend( value )
               for name, value in self.multiparts.items() ]
+            self._params = params
+        return self._params
+
+    @params.setter
+    def params( self, value ):
+        self._params = value
+
+    def _parse_formbody( self ):
+        """Process POST and PUT request interpreting multipart content."""
+        self._postparams, self._multiparts, self._files = {}, {}, {}
+        if self.method not in ( b'POST', b'PUT' ) : return
+
+        postparams, self._multiparts = \
+                h.parse_formbody( self.content_type, self.body )
+        self._postparams = { h.strof(k) : list( map( h.strof, vs )) 
+                             for k,vs in postparams.items() }
+        [ self._files.setdefault( name, [] ).extend(
+                f for f in value if isinstance(f, dict) and 'filename' in f )
+          for name, value in self._multiparts.items() ]
 
     def onfinish( self ):
         """:meth:`pluggdapps.web.interfaces.IHTTPRequest.onfinish`
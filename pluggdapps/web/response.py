@@ -7,8 +7,9 @@
 
 import http.client, time
 import datetime as dt
+from   concurrent.futures import Future
 from   http.cookies import SimpleCookie
-from   os.path      import splitext, isfile
+from   os.path      import splitext, isfile, getmtime
 
 from   pluggdapps.plugin         import implements, Plugin
 from   pluggdapps.web.interfaces import IHTTPResponse, IHTTPOutBound
@@ -26,6 +27,14 @@ _ds1.__doc__ = (
     "Configuration settings for HTTPResponse implementing IHTTPResponse "
     "interface." )
 
+_ds1['template_cache']  = {
+    'default' : 512,
+    'types'   : (int,),
+    'help'    : "Maximum number of compiled templates to be cached, shared by "
+                "all web-applications. Least recently used templates are "
+                "evicted."
+}
+
 class HTTPResponse( Plugin ):
     """Plugin to encapsulate HTTP response."""
 
@@ -70,6 +79,11 @@ class HTTPResponse( Plugin ):
         self.content_coding = None
         self.charset = self.webapp['encoding']
         self.language = self.webapp['language']
+        self.cache_control = None
+        self.response_cache = False
+        self.out_transformers = self.webapp.out_transformers
+        self.content_length = None
+        self.bytes_sent = 0
 
         # Book keeping
         self.httpconn = request.httpconn
@@ -209,6 +223,10 @@ class HTTPResponse( Plugin ):
     }
     _renderer_plugins = {
     }
+    _templates = None
+    """:class:`pluggdapps.utils.lib.LRUCache` of compiled templates, shared
+    by all instances, keyed by renderer and template file."""
+
     def render( self, *args, **kwargs ):
         """:meth:`pluggdapps.interfaces.IHTTPResponse.render`
         interface method.
@@ -238,19 +256,19 @@ class HTTPResponse( Plugin ):
         correct renderer plugin based on file-extension. if ``text`` keyword
         argument is passed, better pass the ``ITemplate`` argument as
         well.
+
+        If the renderer plugin supports :meth:`ITemplate.compile`, compiled
+        template is cached and passed to the plugin as ``template`` keyword
+        argument. In debug mode, cached template is re-compiled when the
+        template file is modified.
         """
         request, context = args[0], args[1]
         renderer = kwargs.get( 'ITemplate', None )
+        tfile = kwargs.get( 'file', '' )
         if renderer is None :
-            tfile = kwargs.get( 'file', '' )
             _, ext = splitext( tfile )
             renderer = self._renderers.get( ext, None ) if ext else None
 
-            # If in debug mode enable ttl file reloading.
-            tfile = h.abspath_from_asset_spec( tfile )
-            if self['debug'] and isfile( tfile ):
-                self.pa._monitoredfiles.append( tfile )
-
         if renderer in self._renderer_plugins :
             plugin = self._renderer_plugins[ renderer ]
         elif renderer :
@@ -261,6 +279,12 @@ class HTTPResponse( Plugin ):
         if plugin :
             self.media_type = 'text/html'
             self._renderer_plugins.setdefault( renderer, plugin )
+            if tfile and hasattr( plugin, 'compile' ) :
+                kwargs['template'] = self._template( renderer, plugin, tfile )
+            elif tfile and self['debug'] :
+                # If in debug mode enable template file reloading.
+                tfile = h.abspath_from_asset_spec( tfile )
+                self.pa._monitoredfiles.add(tfile) if isfile(tfile) else None
             return plugin.render( context, **kwargs )
         else :
             raise Exception('Unknown renderer')
@@ -282,6 +306,31 @@ class HTTPResponse( Plugin ):
 
     #---- Local functions
 
+    def _template( self, renderer, plugin, tfile ):
+        """Return compiled template for ``tfile``, an asset specification or
+        file path, from template cache. Compile it using ``plugin`` if not
+        cached, or in debug mode, if the file's mtime has changed since it was
+        compiled."""
+        cls = self.__class__
+        if cls._templates is None :
+            cls._templates = h.LRUCache(
+                    self['template_cache'], sizeof=lambda x : 1 )
+
+        key = (renderer, tfile)
+        entry = cls._templates.get( key, None )
+        if entry and not self['debug'] : return entry.template
+
+        path = entry.path if entry else h.abspath_from_asset_spec( tfile )
+        mtime = getmtime( path ) if isfile( path ) else None
+        if entry and entry.mtime == mtime : return entry.template
+
+        template = plugin.compile( path )
+        cls._templates.set(
+                key, h.Bunch( path=path, mtime=mtime, template=template ))
+        if self['debug'] and mtime is not None :
+            self.pa._monitoredfiles.add( path )
+        return template
+
     def _try_start_headers( self, finishing=True ) :
         """Generate default headers for this response. And return the
         byte-string of response header to write. This can be overriden
@@ -308,38 +357,76 @@ class HTTPResponse( Plugin ):
                 nC = b'-'.join([ x.capitalize() for x in n.split('_') ])
             lines.append( nC + b': ' + v )
 
-        [ lines.append( b"Set-Cookie: " + cookie.OutputString() )
+        [ lines.append( b"Set-Cookie: " + c.OutputString().encode('utf-8') )
           for c in self.setcookies.values() ]
 
         return b"\r\n".join(lines) + b"\r\n\r\n"
 
     def _flush_body( self, finishing ):
         data = b''.join( self.write_buffer )
-        for tr in self.webapp.out_transformers :
+        self.write_buffer = []
+        if self.request.method == b'HEAD' and self.content_length is not None:
+            data = b''  # Entity length is declared, skip transforming it.
+        self._transform_body( data, finishing, self.out_transformers )
+
+    def _transform_body( self, data, finishing, transformers ):
+        # An out-bound transformer can offload its work, say to a thread
+        # pool, by returning a Future. In which case the remaining
+        # transformers are applied on the loop, once the result is available.
+        for i, tr in enumerate( transformers ) :
             data = tr.transform( self.request, data, finishing=finishing )
+            if isinstance( data, Future ) :
+                ioloop = self.httpconn.server.ioloop
+                callback = lambda fut : ioloop.add_callback( 
+                    lambda : self._ontransformed(
+                                fut, finishing, transformers[i+1:] ))
+                data.add_done_callback( callback )
+                return
+
         if self._if_etag() :
             self.body = data 
         else :
             self.body = b''
-        self.set_header( "content_length", len(self.body) )
+        if self.statuscode == b'304' :
+            pass
+        elif self.content_length is not None :
+            self.set_header( "content_length", self.content_length )
+        else :
+            self.set_header( "content_length", len(self.body) )
         data = self._try_start_headers( finishing=finishing )
         if self.request.method == b'HEAD' :
             pass
         elif self.body :
             data += self.body
+            self.bytes_sent += len( self.body )
         self.httpconn.write( data, callback=self._onflush )
-        self.write_buffer = []
+
+    def _ontransformed( self, fut, finishing, transformers ):
+        """Continue with the result of an offloaded transformation. If it
+        has failed, respond with `500 Internal Server Error` so that the
+        response is finished instead of left hanging."""
+        try :
+            data = fut.result()
+        except Exception :
+            self.pa.logerror( h.print_exc() )
+            self.statuscode = b'500'
+            self.content_length = None
+            self.headers.pop( 'content_encoding', None )
+            self.headers.pop( 'etag', None )
+            data, transformers = b'', []
+        self._transform_body( data, finishing, transformers )
 
     def _flush_chunk( self, finishing ):
         self.add_headers( 'transfer_encoding', 'chunked' )
         data = self._try_start_headers( finishing=finishing )
 
         chunk = self.write_buffer( self.request, self.c )
-        for tr in self.webapp.out_transformers :
+        for tr in self.out_transformers :
             chunk = tr.transform( self.request, chunk, finishing=finishing )
 
         if chunk :
             data += hex(len(chunk)).encode('utf-8') + b'\r\n' + chunk + b'\r\n'
+            self.bytes_sent += len( chunk )
         else :
             data += b'0\r\n'
             if self.trailers :
@@ -378,6 +465,13 @@ class HTTPResponse( Plugin ):
         interface method."""
         return _ds1
 
+    @classmethod
+    def normalize_settings( cls, sett ):
+        """:meth:`pluggdapps.plugin.interfaces.ISettings.normalize_settings`
+        interface method."""
+        sett['template_cache'] = h.asint( sett['template_cache'] )
+        return sett
+
 
 _ds2 = h.ConfigDict()
 _ds2.__doc__ = ( 
@@ -398,7 +492,10 @@ class ResponseHeaders( Plugin ):
         transfer-coding.
       * `Last-Modified` is set only when it is available from response
         context.
-      * `Etag` is set, if available, from the response context
+      * `Etag` is set, if available, from the response context. Unless it
+        is already set, like by the router for ``conditional`` views. If
+        the request's `If-None-Match` matches the etag, status is set to
+        `304 Not Modified` and entity is discarded.
     """
 
     implements( IHTTPOutBound )
@@ -422,6 +519,8 @@ class ResponseHeaders( Plugin ):
                 resp.set_header( 'content_language', resp.language )
             if resp.content_coding :
                 resp.set_header( 'content_encoding', resp.content_coding )
+            if resp.cache_control and 'cache_control' not in resp.headers :
+                resp.set_header( 'cache_control', resp.cache_control )
 
             # For HTTP/1.1 connection can be kept alive across multiple request
             # and response.
@@ -450,12 +549,19 @@ class ResponseHeaders( Plugin ):
             # If etag is available from context, compute and subsequently
             # clear them.
             # IMPORANT : Do not change this sequence of last-modified and etag
-            etag = c.etag.hashout( prefix="view-", joinwith=c.pop('etag','') )
+            etag = c.etagout( prefix="view-", joinwith=c.pop('etag','') )
             etag = ('"%s"' % etag).encode( 'utf-8' ) if etag else etag
-            c.etag.clear()
-            if ( resp.ischunked() == False and resp.statuscode == b'200' and
-                 request.method in (b'GET', b'HEAD') and etag ) :
+            if ( resp.ischunked() == False and
+                 resp.statuscode in (b'200', b'206') and
+                 request.method in (b'GET', b'HEAD') and etag and
+                 'etag' not in resp.headers ) :
                 resp.set_header( "etag", etag )
+                # Answer `304 Not Modified` here so that rest of the out-bound
+                # transformers need not process the entity.
+                inm = request.headers.get( "if_none_match", b'' )
+                if inm and (inm.strip() == b'*' or etag[:-1] in inm) :
+                    resp.set_status( b'304' )
+                    return b''
 
         return data
 
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+"""Server side HTTP response cache, implemented as a pair of in-bound and
+out-bound transformer plugins. Configure ``pluggdapps.ResponseCacheInBound``
+as :class:`IHTTPInBound` plugin and append ``pluggdapps.ResponseCacheOutBound``
+as the last :class:`IHTTPOutBound` plugin for the web-application. And enable
+``response_cache`` for the views whose responses can be cached."""
+
+import time, re
+
+import pluggdapps.utils          as h
+from   pluggdapps.plugin         import Plugin, implements
+from   pluggdapps.web.interfaces import IHTTPInBound, IHTTPOutBound
+
+re_directive = re.compile( r'([a-z-]+)\s*(?:=\s*"?([0-9]+)"?)?' )
+
+VARYSIZE = 64
+"""Approximate size, in bytes, accounted for a base-key's vary entry."""
+
+_stores = {}
+"""Dictionary of web-application's netpath and its response store shared by
+both in-bound and out-bound plugins."""
+
+def storefor( plugin ):
+    """Return the response store for ``plugin``'s web-application. Store
+    has a ``cache`` attribute, an instance of :class:`h.LRUCache`, mapping
+    base-key to the request headers named by response's `Vary` header, and
+    base-key suffixed with values of those request headers to cached
+    response. Thus both are bounded by ``cache_size``."""
+    netpath = plugin.webapp.netpath
+    if netpath not in _stores :
+        _stores[ netpath ] = h.Bunch( cache=h.LRUCache( plugin['cache_size'] ))
+    return _stores[ netpath ]
+
+def basekey( request ):
+    """Cache key for ``request`` without the vary'd request headers. HEAD
+    requests share the entry with GET request."""
+    parts = request.uriparts
+    return ( b'GET', parts['host'], parts['script'], parts['path'],
+             getattr( parts, 'rawquery', b'' ) )
+
+def parse_cache_control( value ):
+    """Parse cache-control header ``value`` into a dictionary of directive
+    and its value. Directives without a value are mapped to True."""
+    value = h.strof( value or b'' ).lower()
+    return { d : (int(v) if v else True)
+             for d, v in re_directive.findall( value ) }
+
+
+class ResponseCacheInBound( Plugin ):
+    """In-bound transformer answering GET and HEAD requests from server side
+    response cache, before the request is routed to resource and view. A
+    stale entry, within its `stale-while-revalidate` period, is served as it
+    is while one request is allowed to pass through to refresh the entry."""
+
+    implements( IHTTPInBound )
+
+    def transform( self, request, data, finishing=False ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPInBound.transform`
+        interface method."""
+        if request.method not in (b'GET', b'HEAD') : return data
+        if b'no-cache' in request.headers.get( 'cache_control', b'' ) :
+            return data
+        if 'authorization' in request.headers : return data
+
+        store = storefor( self )
+        key = basekey( request )
+        vary = store.cache.get( key, None )
+        if vary is None : return data
+
+        key += ( tuple( request.headers.get( name, None ) for name in vary ), )
+        entry = store.cache.get( key, None )
+        if entry is None : return data
+
+        now = time.time()
+        if now > entry.expires :
+            if now > entry.expires + entry.swr or entry.revalidating < now :
+                # Let this request pass-through and refresh the entry.
+                entry.revalidating = now + self['revalidate_timeout']
+                return data
+
+        self._respond( request, entry, now )
+        return data
+
+    #-- local methods
+
+    def _respond( self, request, entry, now ):
+        """Send cached ``entry`` as response for ``request``."""
+        resp = request.response
+        resp.out_transformers = []  # Cached response is already transformed.
+        resp.set_status( entry.statuscode )
+        resp.headers.update( entry.headers )
+        resp.set_header( 'date', h.http_fromdate( now ))
+        resp.set_header( 'age', int( now - entry.storedat ))
+        resp.write( entry.body )
+        resp.flush( finishing=True )
+
+    #---- ISettings interface methods
+
+    @classmethod
+    def default_settings( cls ):
+        """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
+        method.
+        """
+        return _default_settings
+
+    @classmethod
+    def normalize_settings( cls, sett ):
+        """:meth:`pluggdapps.plugin.ISettings.normalize_settings` interface
+        method.
+        """
+        sett['cache_size'] = h.asint( sett['cache_size'] )
+        sett['max_ttl'] = h.asint( sett['max_ttl'] )
+        sett['stale_while_revalidate'] = \
+                h.asint( sett['stale_while_revalidate'] )
+        sett['revalidate_timeout'] = h.asint( sett['revalidate_timeout'] )
+        return sett
+
+
+class ResponseCacheOutBound( Plugin ):
+    """Out-bound transformer to store cacheable responses in server side
+    response cache. Must be configured as the last out-bound transformer so
+    that the stored response is what is sent on the wire. A response is
+    cacheable if,
+
+    * response is for a GET request with `200` status. Response to HEAD
+      request does not carry the entity to be stored.
+    * entire response is flushed in one go, and not chunked.
+    * its view has enabled ``response_cache``.
+    * its `Cache-Control` header has `max-age` or `s-maxage` directive and
+      does not have `private`, `no-store` or `no-cache` directives.
+    * it does not set cookies and `Vary` header is not `*`.
+
+    Entries expire after `s-maxage` or `max-age` seconds, limited by
+    ``max_ttl`` setting. Entries are keyed by request's host, path, query
+    and the request headers named by response's `Vary` header.
+    """
+
+    implements( IHTTPOutBound )
+
+    #---- IHTTPOutBound method APIs
+
+    def transform( self, request, data, finishing=True ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPOutBound.transform` interface
+        method."""
+        resp = request.response
+        if not ( finishing and resp.response_cache ) : return data
+        if resp.isstarted() or resp.ischunked() : return data
+        if request.method != b'GET' : return data
+        if resp.statuscode != b'200' or resp.setcookies : return data
+        if 'authorization' in request.headers : return data
+
+        cc = parse_cache_control( resp.headers.get( 'cache_control', b'' ))
+        if cc.get('private') or cc.get('no-store') or cc.get('no-cache') :
+            return data
+        ttl = cc.get( 's-maxage', cc.get( 'max-age', None ))
+        if not isinstance( ttl, int ) or ttl <= 0 : return data
+        ttl = min( ttl, self['max_ttl'] ) if self['max_ttl'] else ttl
+
+        vary = h.parsecsv( h.strof( resp.headers.get( 'vary', b'' )))
+        if '*' in vary : return data
+        vary = [ x.strip().lower().replace( '-', '_' ) for x in vary ]
+        if resp.headers.get( 'content_encoding', b'' ).strip() :
+            vary.append( 'accept_encoding' )
+        vary = tuple( sorted( set( vary )))
+
+        store = storefor( self )
+        key = basekey( request )
+        store.cache.set( key, vary, size=VARYSIZE )
+        key += ( tuple( request.headers.get( name, None ) for name in vary ), )
+
+        now = time.time()
+        swr = cc.get( 'stale-while-revalidate',
+                      self['stale_while_revalidate'] )
+        headers = { k : v for k, v in resp.headers.items()
+                    if k not in ('date', 'connection', 'content_length') }
+        entry = h.Bunch( statuscode=resp.statuscode, headers=headers,
+                         body=data, storedat=now, expires=now+ttl,
+                         swr=swr if isinstance(swr, int) else 0,
+                         revalidating=0 )
+        store.cache.set( key, entry, size=len(data) )
+        return data
+
+    #---- ISettings interface methods
+
+    @classmethod
+    def default_settings( cls ):
+        """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
+        method.
+        """
+        return _default_settings
+
+    @classmethod
+    def normalize_settings( cls, sett ):
+        """:meth:`pluggdapps.plugin.ISettings.normalize_settings` interface
+        method.
+        """
+        return ResponseCacheInBound.normalize_settings( sett )
+
+
+_default_settings = h.ConfigDict()
+_default_settings.__doc__ = (
+    "Server side HTTP response cache, implemented as a pair of in-bound and "
+    "out-bound transformer plugins." )
+
+_default_settings['cache_size']  = {
+    'default' : 16 * 1024 * 1024,
+    'types'   : (int,),
+    'help'    : "Maximum size, in bytes, of response bodies to be cached. "
+                "Least recently used responses are evicted. The cache is "
+                "created using in-bound plugin's configuration."
+}
+_default_settings['max_ttl']  = {
+    'default' : 3600,
+    'types'   : (int,),
+    'help'    : "Maximum number of seconds a response can remain fresh in the "
+                "cache, irrespective of its max-age. Zero means no limit."
+}
+_default_settings['stale_while_revalidate']  = {
+    'default' : 0,
+    'types'   : (int,),
+    'help'    : "Number of seconds a stale response can be served, while it "
+                "is being refreshed, if the response does not specify "
+                "stale-while-revalidate cache-control directive."
+}
+_default_settings['revalidate_timeout']  = {
+    'default' : 10,
+    'types'   : (int,),
+    'help'    : "While serving stale response, another request is allowed to "
+                "pass-through for refreshing the entry if the previous one "
+                "did not refresh it within these many seconds."
+}
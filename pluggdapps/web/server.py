@@ -60,6 +60,7 @@ class HTTPEPollServer( Plugin ):
         # Attributes
         self.sockets = {}      # fd->socket mapping for listening sockets.
         self.connections = []  # [ HTTPConnection() ]
+        self.pa.subscribe( self )
 
     #---- IHTTPServer interface methods.
 
@@ -97,7 +98,8 @@ class HTTPEPollServer( Plugin ):
         """:meth:`pluggdapps.interfaces.IHTTPServer.close_connection` 
         interface method."""
         if httpconn in self.connections :
-            self.pa.logdebug("Closing connection %r ..."%(httpconn.address,))
+            self.pa.logdebug( "Closing connection %r ...", (httpconn.address,),
+                              name='web.server' )
             self.connections.remove( httpconn )
 
     #---- Internal methods
@@ -209,6 +211,12 @@ class HTTPEPollServer( Plugin ):
 
     #---- ISettings interface methods
 
+    def onconfig( self, name, value ):
+        """:meth:`pluggdapps.plugin.ISettings.onconfig` interface method.
+        Poll settings are copied to IOLoop."""
+        if name in ( 'poll_threshold', 'poll_timeout' ) :
+            setattr( self.ioloop, name, value )
+
     @classmethod
     def default_settings( cls ):
         """:meth:`pluggdapps.plugin.ISettings.default_settings` interface 
@@ -345,7 +353,8 @@ def add_accept_handler( server, sock, callback, ioloop ):
                     return
                 server.pa.logerror( h.print_exc() )
 
-            server.pa.logdebug( "Accepting new connection from %r"%(address,) )
+            server.pa.logdebug( "Accepting new connection from %r", (address,),
+                                 name='web.server' )
             callback( connection, address )
 
     ioloop.add_handler( sock.fileno(), accept_handler, IOLoop.READ )
@@ -399,6 +408,11 @@ class IOLoop( object ):
     poll_timeout = None
     """Timout value while waiting on epoll()."""
 
+    lag = 0.0
+    """Exponentially weighted average of time, in seconds, spent by each
+    iteration of the loop handling callbacks, timeouts and events. Plugins
+    can use this as a measure of loop's load."""
+
     server = None
     """:class:`IHTTPServer` plugin."""
 
@@ -420,6 +434,7 @@ class IOLoop( object ):
         self._timeouts = []
         self._running = False
         self._stopped = False
+        self.lag = 0.0
 
         server.pa.logdebug( "Adding poll-loop waker ..." )
         self.add_handler( self._waker.fileno(), 
@@ -440,16 +455,19 @@ class IOLoop( object ):
             self.server.pa.logwarn(
                 "Polled descriptors exceeded threshold" % self.poll_threshold
             )
-        self.server.pa.logdebug( "Add descriptor to epoll : %s" % fd )
+        self.server.pa.logdebug( "Add descriptor to epoll : %s", (fd,),
+                                 name='web.server' )
 
     def update_handler( self, fd, events ):
         """Changes the events we listen for fd."""
         self._evpoll.modify( fd, events | self.ERROR )
-        self.server.pa.logdebug("Updating descriptor : %s, %s" % (fd, events))
+        self.server.pa.logdebug( "Updating descriptor : %s, %s",
+                                 (fd, events), name='web.server' )
 
     def remove_handler( self, fd ):
         """Stop listening for events on fd."""
-        self.server.pa.logdebug( "Remove descriptor from epoll : %s:" % fd )
+        self.server.pa.logdebug( "Remove descriptor from epoll : %s:", (fd,),
+                                 name='web.server' )
         self._handlers.pop(fd, None)
         self._events.pop(fd, None)
         try:
@@ -495,7 +513,7 @@ class IOLoop( object ):
         Note that exceptions within the `callback` must be handled within the
         callback itself.
         """
-        list_empty = self._callbacks
+        list_empty = not self._callbacks
         self._callbacks.append( callback )
         self._waker.wake() if list_empty else None
 
@@ -514,6 +532,7 @@ class IOLoop( object ):
         self._running = True
         while True :
             poll_timeout = self.poll_timeout
+            busystart = time.time()
 
             # Prevent IO event starvation by delaying new callbacks
             # to the next iteration of the event loop.
@@ -548,6 +567,7 @@ class IOLoop( object ):
             if self._running == False : # stop() is called !
                 break
 
+            busy = time.time() - busystart
             try:
                 event_pairs = self._evpoll.poll( poll_timeout )
             except Exception as e:
@@ -565,6 +585,7 @@ class IOLoop( object ):
             # its handler. Since that handler may perform actions on
             # other file descriptors, there may be reentrant calls to
             # this IOLoop that update self._events
+            polledat = time.time()
             self._events.update(event_pairs)
             while self._events :
                 fd, events = self._events.popitem()
@@ -572,6 +593,10 @@ class IOLoop( object ):
                 try    : callback( fd, events ) if callback else None
                 except : self.server.pa.logerror( h.print_exc() )
 
+            # Measure the loop's load.
+            busy += time.time() - polledat
+            self.lag = 0.8 * self.lag + 0.2 * busy
+
         # reset the stopped flag so another start/stop pair can be issued
         self._stopped = False
 
@@ -979,7 +1004,8 @@ class HTTPConnection( Plugin ):
     def on_timeout( self ):
         """The connection was idle and a timeout has occured. Close the
         connection."""
-        self.pa.logdebug( "Connection %r timed-out" % (self.address,) )
+        self.pa.logdebug( "Connection %r timed-out", (self.address,),
+                          name='web.server' )
         self.tryclose( disconnect=True )
 
     def on_connection_close( self ):
@@ -1237,7 +1263,8 @@ class IOStream( object ):
 
     def close( self ):
         """Close this stream."""
-        self.server.pa.logdebug("Closing the stream for %r" % (self.address,))
+        self.server.pa.logdebug( "Closing the stream for %r", (self.address,),
+                                 name='web.server' )
         if self.conn :
             if self._read_until_close :
                 self.docallback( self._read_buffer_size, self._read_callback )
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+# This file is subject to the terms and conditions defined in
+# file 'LICENSE', which is part of this source code package.
+#       Copyright (c) 2011 R Pratap Chakravarthy
+
+"""Server side user-sessions. Only a signed session-id is sent as cookie,
+while session data is kept in a tiered store - an in-process least recently
+used cache, backed by an optional sqlite3 database."""
+
+import time, uuid, pickle, sqlite3
+import datetime as dt
+
+import pluggdapps.utils          as h
+from   pluggdapps.plugin         import Plugin, implements
+from   pluggdapps.web.interfaces import IHTTPSession
+
+_stores = {}
+"""Dictionary of web-application's netpath and its session store."""
+
+def storefor( plugin ):
+    """Return the session store for ``plugin``'s web-application. Store has
+    a ``cache`` attribute, an instance of :class:`h.LRUCache` mapping
+    session-id to a tuple of (session data, expiry time), and a ``conn``
+    attribute, sqlite3 connection to persist session data, if configured."""
+    netpath = plugin.webapp.netpath
+    if netpath not in _stores :
+        conn = None
+        if plugin['url'] :
+            conn = sqlite3.connect( plugin['url'] )
+            conn.execute( "PRAGMA journal_mode=WAL" )
+            conn.execute( "PRAGMA synchronous=NORMAL" )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id TEXT PRIMARY KEY, data BLOB, expires REAL)" )
+            conn.execute( "DELETE FROM sessions WHERE expires < ?",
+                          (time.time(),) )
+            conn.commit()
+        _stores[ netpath ] = h.Bunch(
+            cache=h.LRUCache( plugin['cache_size'], sizeof=lambda x : 1 ),
+            conn=conn )
+    return _stores[ netpath ]
+
+
+class HTTPSession( Plugin ):
+    """Plugin implementing :class:`IHTTPSession` interface, to handle
+    server side user-sessions. Session-id is sent as signed cookie, using
+    :meth:`IHTTPResponse.set_secure_cookie`, only when session data is set
+    for the first time.
+
+    Session data is loaded lazily, when accessed for the first time, from
+    in-process cache, or else from sqlite3 database configured by ``url``
+    setting. When request is finished, session data is written back to the
+    database only if it is modified.
+
+    Session expires ``max_age`` seconds after it is last modified. Since the
+    expiry is also signed into the session-id cookie, cookie is re-issued
+    when session data is modified for the first time in a request. If the
+    response is already started by then, cookie cannot be re-issued and the
+    session's expiry is left as it is.
+    """
+
+    implements( IHTTPSession )
+
+    sessionid = None
+    dirty = False
+
+    _data = None
+    _expires = None
+
+    def __init__( self, request ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPSession.__init__` interface
+        method."""
+        self.request = request
+        self.sessionid = None
+        self.dirty = False
+        self._data = self._expires = None
+
+    def get( self, name, default=None ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPSession.get` interface
+        method."""
+        return self._load().get( name, default )
+
+    def set( self, name, value ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPSession.set` interface
+        method."""
+        data = self._load()
+        if self.sessionid is None :
+            self.sessionid = uuid.uuid4().hex
+            self._expires = time.time() + self['max_age']
+            storefor( self ).cache.set( self.sessionid, (data, self._expires) )
+        self._modified()
+        data[ name ] = value
+
+    def pop( self, name, default=None ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPSession.pop` interface
+        method."""
+        data = self._load()
+        if name in data :
+            self._modified()
+        return data.pop( name, default )
+
+    def invalidate( self ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPSession.invalidate` interface
+        method."""
+        self._load()
+        if self.sessionid :
+            store = storefor( self )
+            store.cache.pop( self.sessionid )
+            if store.conn :
+                store.conn.execute( "DELETE FROM sessions WHERE id = ?",
+                                    (self.sessionid,) )
+                store.conn.commit()
+            self._set_cookie( '', days=-365 )
+        self.sessionid, self._data, self.dirty = None, {}, False
+        self._expires = None
+
+    def save( self ):
+        """:meth:`pluggdapps.web.interfaces.IHTTPSession.save` interface
+        method."""
+        if not ( self.dirty and self.sessionid ) : return
+        store = storefor( self )
+        store.cache.set( self.sessionid, (self._data, self._expires) )
+        if store.conn :
+            store.conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires) "
+                "VALUES (?, ?, ?)",
+                ( self.sessionid, pickle.dumps( self._data ), self._expires ))
+            store.conn.commit()
+        self.dirty = False
+
+    #-- local methods
+
+    def _load( self ):
+        """Load session data for request's session-id cookie, if not already
+        loaded."""
+        if self._data is not None : return self._data
+
+        self._data = {}
+        sessionid = self.request.get_secure_cookie( self['cookie_name'] )
+        if not sessionid : return self._data
+
+        store, now = storefor( self ), time.time()
+        data, expires = store.cache.get( sessionid, (None, None) )
+        if expires is not None and expires < now :
+            store.cache.pop( sessionid )    # Expired, while in cache.
+            data = None
+        elif data is None and store.conn :
+            row = store.conn.execute(
+                    "SELECT data, expires FROM sessions "
+                    "WHERE id = ? AND expires >= ?", (sessionid, now)
+                  ).fetchone()
+            if row :
+                data, expires = pickle.loads( row[0] ), row[1]
+                store.cache.set( sessionid, (data, expires) )
+
+        if data is not None :
+            self.sessionid, self._data = sessionid, data
+            self._expires = expires
+        return self._data
+
+    def _modified( self ):
+        """Mark session data as modified. On first modification, re-issue
+        session-id cookie and extend session's expiry along with it."""
+        if not self.dirty and self._set_cookie( self.sessionid ) :
+            self._expires = time.time() + self['max_age']
+        self.dirty = True
+
+    def _set_cookie( self, value, days=None ):
+        """Set session-id cookie, expiring along with the session, or
+        after ``days``. Return False if the response is already started."""
+        resp = self.request.response
+        if resp.isstarted() :
+            self.pa.logwarn( "Session cookie cannot be set, response started" )
+            return False
+        delta = dt.timedelta( seconds=self['max_age'] ) if days is None \
+                    else dt.timedelta( days=days )
+        resp.set_secure_cookie( self['cookie_name'], value, httponly=True,
+                                expires=dt.datetime.utcnow() + delta )
+        return True
+
+    #---- ISettings interface methods
+
+    @classmethod
+    def default_settings( cls ):
+        """:meth:`pluggdapps.plugin.ISettings.default_settings` interface
+        method.
+        """
+        return _default_settings
+
+    @classmethod
+    def normalize_settings( cls, sett ):
+        """:meth:`pluggdapps.plugin.ISettings.normalize_settings` interface
+        method.
+        """
+        sett['cache_size'] = h.asint( sett['cache_size'] )
+        sett['max_age'] = h.asint( sett['max_age'] )
+        return sett
+
+
+_default_settings = h.ConfigDict()
+_default_settings.__doc__ = HTTPSession.__doc__
+
+_default_settings['cookie_name']  = {
+    'default' : 'pasession',
+    'types'   : (str,),
+    'help'    : "Name of the cookie carrying signed session-id."
+}
+_default_settings['cache_size']  = {
+    'default' : 10000,
+    'types'   : (int,),
+    'help'    : "Maximum number of sessions to be cached in memory. Least "
+                "recently used sessions are evicted."
+}
+_default_settings['max_age']  = {
+    'default' : 60*60*24*7,     # 7 days
+    'types'   : (int,),
+    'help'    : "Number of seconds a session remains valid after it is last "
+                "modified."
+}
+_default_settings['url'] = {
+    'default'   : '',
+    'types'     : (str,),
+    'help'      : "Location of sqlite3 database file to persist sessions. "
+                  "Will be passed to sqlite3.connect() API. If not "
+                  "configured, sessions are kept only in memory.",
+    'webconfig' : False,
+}
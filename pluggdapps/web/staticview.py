@@ -4,12 +4,18 @@
 # file 'LICENSE', which is part of this source code package.
 #       Copyright (c) 2011 R Pratap Chakravarthy
 
-import os, mimetypes
-from   os.path          import join, isfile
+import os, mimetypes, uuid, time, stat, hashlib
+from   os.path          import join, splitext, relpath
+
+try :
+    import resource
+except ImportError :
+    resource = None
 
 import pluggdapps.utils             as h
 from   pluggdapps.plugin            import Plugin, implements
 from   pluggdapps.web.interfaces import IHTTPView
+from   pluggdapps.web.gzip       import accepts_gzip, vary_encoding
 
 class StaticView( Plugin ):
     """Plugin to serve static files over HTTP."""
@@ -27,23 +33,47 @@ class StaticView( Plugin ):
         method.
         """
         resp = request.response
-        assetpath = h.abspath_from_asset_spec( self.view['rootloc'] )
-        docfile = join( assetpath, request.matchdict['path'] )
+        assetpath = assetpathof( self.view['rootloc'] )
+        path = request.matchdict['path']
+        manifest = self.view.get( 'fingerprints', None )
+        fingerprint = manifest.reverse.get( path, None ) if manifest else None
+        if fingerprint :
+            path = fingerprint[0]
+        docfile = join( assetpath, path )
+        info = docinfo( self, docfile ) if docfile else None
+        if info and manifest and refingerprint( manifest, path, info ) :
+            request.router.urlmemo.clear()  # Memoized urls for old path.
 
-        if docfile and isfile( docfile ) :
+        if info :
             # Collect information about the document, for response.
             resp.set_status( b'200' )
-            stat = os.stat( docfile )
-            (typ, enc) = mimetypes.guess_type( docfile )
-            if typ :
-                resp.media_type = typ
-            if enc :
-                resp.content_coding = enc
+            if info.typ :
+                resp.media_type = info.typ
+            if info.enc :
+                resp.content_coding = info.enc
+            resp.set_header( 'accept_ranges', b'bytes' )
             # Populate the context
-            c.etag['body'] = open( docfile, 'rb' ).read()
-            c['last_modified'] = h.http_fromdate( stat.st_mtime )
-            cc = ('public,max-age=%s' % str(self['max_age']) ).encode('utf-8')
-            resp.set_header( 'cache_control', cc )
+            c.etag.hashin( info.token )
+            c['last_modified'] = info.last_modified
+            c['docfile'] = docfile
+            if fingerprint and fingerprint[1] == info.token :
+                # Content for fingerprinted path never changes.
+                cc = 'public,max-age=%s,immutable' % self['immutable_max_age']
+            else :
+                cc = 'public,max-age=%s' % str(self['max_age'])
+            resp.set_header( 'cache_control', cc.encode('utf-8') )
+            # Send partial content, if requested.
+            ranges = byteranges( request, c, info.size, self['max_ranges'] )
+            if ranges is not None :
+                resp.content_coding = info.enc  # Ranges of document as it is.
+                sendranges( self, request, info, ranges )
+                return
+            gzinfo = precompressed( self, request, info )
+            if gzinfo :
+                c['precompressed'] = True
+                c['body'] = docbody( self, request, gzinfo )
+            else :
+                c['body'] = docbody( self, request, info )
             # Send Response
             resp.write( c['body'] )
             resp.flush( finishing=True )
@@ -67,8 +97,339 @@ class StaticView( Plugin ):
     @classmethod
     def normalize_settings( cls, sett ):
         sett['max_age'] = h.asint( sett['max_age'] )
+        sett['immutable_max_age'] = h.asint( sett['immutable_max_age'] )
+        sett['max_ranges'] = h.asint( sett['max_ranges'] )
+        sett['range_window'] = h.asint( sett['range_window'] )
+        sett['doccache_size'] = h.asint( sett['doccache_size'] )
+        sett['doccache_content'] = h.asint( sett['doccache_content'] )
+        sett['missing_size'] = h.asint( sett['missing_size'] )
+        sett['stat_interval'] = h.asfloat( sett['stat_interval'] )
+        sett['fdcache_size'] = h.asint( sett['fdcache_size'] )
         return sett
 
+
+_assetpaths = {}
+"""Dictionary of asset specification and its absolute path."""
+
+_doccaches = {}
+"""Dictionary of web-application's netpath and its cache of static
+documents, shared by static views of the web-application."""
+
+_missingcaches = {}
+"""Dictionary of web-application's netpath and its cache of missing
+documents, kept apart from :data:`_doccaches` so that requests for
+non-existent files do not evict cached documents."""
+
+_fdcaches = {}
+"""Dictionary of web-application's netpath and its cache of open file
+descriptors, shared by static views of the web-application."""
+
+def fingerprints( rootloc ):
+    """Build a manifest of static files under ``rootloc`` and their
+    fingerprinted paths, that are suffixed with a hash of file's content,
+    like `js/app.3f9a2c1b0e.js` for `js/app.js`. Return a
+    :class:`pluggdapps.utils.lib.Bunch` object with ``forward`` attribute,
+    a dictionary of path and its fingerprinted path, and ``reverse``
+    attribute, a dictionary of fingerprinted path and a tuple of
+    (path, token). ``token`` is the (inode, size, mtime) of the file when it
+    was fingerprinted, to detect files modified there after, refer
+    :func:`refingerprint`."""
+    forward, reverse = {}, {}
+    for dirpath, dirs, files in os.walk( rootloc ) :
+        for f in files :
+            if f.endswith( '.gz' ) : continue
+            docfile = join( dirpath, f )
+            st = os.stat( docfile )
+            path = relpath( docfile, rootloc ).replace( os.sep, '/' )
+            fppath = fingerprintof( path, docfile )
+            forward[ path ] = fppath
+            reverse[ fppath ] = (path, (st.st_ino, st.st_size, st.st_mtime))
+    return h.Bunch( forward=forward, reverse=reverse )
+
+def fingerprintof( path, docfile ):
+    """Return fingerprinted path for static file ``path`` located at
+    ``docfile``. File is hashed in chunks, so that large files are not read
+    into memory."""
+    digest = hashlib.blake2b( digest_size=5 )
+    with open( docfile, 'rb' ) as fd :
+        for chunk in iter( lambda : fd.read( 64 * 1024 ), b'' ) :
+            digest.update( chunk )
+    base, ext = splitext( path )
+    return '%s.%s%s' % (base, digest.hexdigest(), ext)
+
+def refingerprint( manifest, path, info ):
+    """If static file ``path``, described by ``info`` as returned by
+    :func:`docinfo`, is modified since it was fingerprinted, add a new
+    fingerprinted path for it to ``manifest``. Old fingerprinted path is
+    still resolved to the file, but no longer served as immutable. Return
+    True if ``manifest`` is updated."""
+    fppath = manifest.forward.get( path, None )
+    if fppath is None or manifest.reverse[ fppath ][1] == info.token :
+        return False
+    fppath = fingerprintof( path, info.docfile )
+    manifest.forward[ path ] = fppath
+    manifest.reverse[ fppath ] = ( path, info.token )
+    return True
+
+def assetpathof( rootloc ):
+    """Memoized :func:`pluggdapps.utils.lib.abspath_from_asset_spec`."""
+    try :
+        return _assetpaths[ rootloc ]
+    except KeyError :
+        return _assetpaths.setdefault(
+                    rootloc, h.abspath_from_asset_spec( rootloc ))
+
+def docinfo( plugin, docfile ):
+    """Return information about the static document ``docfile`` as
+    :class:`pluggdapps.utils.lib.Bunch` object, or None if ``docfile`` is
+    not a regular file. Information is cached in a least recently used
+    cache, created using ``plugin``'s configuration, and contains,
+
+    ``docfile``, ``size``, ``typ``, ``enc``,
+        Path, size of the file, its media-type and encoding.
+    ``last_modified``,
+        Last-Modified date of the file in HTTP format.
+    ``token``,
+        Tuple of (inode, size, mtime) identifying the file's content, to be
+        hashed for computing etag.
+    ``body``,
+        File content, if file is not larger than ``doccache_content``
+        setting, else None.
+
+    Cached entries are revalidated with os.stat() not more than once for
+    every ``stat_interval`` seconds. Until then, documents are served without
+    touching the file system. Missing documents, like absent .gz siblings,
+    are remembered likewise, in a separate cache of ``missing_size``
+    entries.
+    """
+    netpath = plugin.webapp.netpath
+    if netpath not in _doccaches :
+        _doccaches[ netpath ] = h.LRUCache( plugin['doccache_size'] )
+        _missingcaches[ netpath ] = h.LRUCache(
+                plugin['missing_size'], sizeof=lambda x : 1 )
+    cache, missing = _doccaches[ netpath ], _missingcaches[ netpath ]
+
+    now = time.time()
+    info = cache.get( docfile, None )
+    if info and (now - info.checkedat) < plugin['stat_interval'] :
+        return info
+    checkedat = missing.get( docfile, None ) if info is None else None
+    if checkedat and (now - checkedat) < plugin['stat_interval'] :
+        return None
+
+    try :
+        st = os.stat( docfile )
+    except OSError :
+        st = None
+    if st is None or not stat.S_ISREG( st.st_mode ) :
+        cache.pop( docfile ) if info else None
+        missing.set( docfile, now )
+        return None
+    elif checkedat :
+        missing.pop( docfile )
+
+    token = (st.st_ino, st.st_size, st.st_mtime)
+    if info and info.token == token :
+        info.checkedat = now
+        return info
+
+    (typ, enc) = mimetypes.guess_type( docfile )
+    if st.st_size <= plugin['doccache_content'] :
+        body = open( docfile, 'rb' ).read()
+    else :
+        body = None
+    info = h.Bunch( docfile=docfile, size=st.st_size, typ=typ, enc=enc,
+                    last_modified=h.http_fromdate( st.st_mtime ),
+                    token=token, body=body, checkedat=now )
+    # Account for the meta-data as well, approximately.
+    cache.set( docfile, info, size=len(body or b'') + 256 )
+    return info
+
+def precompressed( plugin, request, info ):
+    """Return information, as returned by :func:`docinfo`, about the
+    pre-compressed ``.gz`` sibling of static document described by ``info``,
+    if it is up-to-date and if the response is negotiated for gzip
+    content-coding and the client accepts gzip. Else return None. Response
+    is marked to vary by `Accept-Encoding` if gzip is negotiated."""
+    coding = request.response.content_coding or ''
+    if 'gzip' not in coding or info.enc : return None
+    vary_encoding( request.response )
+    if not accepts_gzip( request ) : return None
+    gzinfo = docinfo( plugin, info.docfile + '.gz' )
+    return gzinfo if gzinfo and gzinfo.token[2] >= info.token[2] else None
+
+def docbody( plugin, request, info ):
+    """Return the entity to be sent for static document described by
+    ``info``, reading it from the file system unless it is cached. For HEAD
+    request, document is not read, instead its size is declared as
+    response's content-length."""
+    if request.method == b'HEAD' :
+        request.response.content_length = info.size
+        return b''
+    elif info.body is not None :
+        return info.body
+    else :
+        return docread( plugin, info, info.size, 0 )
+
+def docread( plugin, info, n, offset ):
+    """Read ``n`` bytes, from ``offset``, of static document described by
+    ``info``. File descriptors of large documents, whose content is not
+    cached, are kept open in a least recently used cache, along with the
+    (inode, size, mtime) of the file when it was opened. If the file is
+    replaced or modified on disk, as detected by :func:`docinfo`, it is
+    re-opened."""
+    if info.body is not None :
+        return info.body[ offset : offset+n ]
+
+    netpath = plugin.webapp.netpath
+    if netpath not in _fdcaches :
+        _fdcaches[ netpath ] = h.LRUCache(
+                fdbudget( plugin['fdcache_size'] ), sizeof=lambda x : 1,
+                onevict=lambda docfile, entry : os.close( entry.fd ) )
+    cache = _fdcaches[ netpath ]
+
+    entry = cache.get( info.docfile, None )
+    if entry and entry.token == info.token :
+        return os.pread( entry.fd, n, offset )
+    elif entry :
+        cache.pop( info.docfile )   # Descriptor is closed by onevict.
+
+    fd = os.open( info.docfile, os.O_RDONLY )
+    st = os.fstat( fd )
+    entry = h.Bunch( fd=fd, token=(st.st_ino, st.st_size, st.st_mtime) )
+    try :
+        return os.pread( fd, n, offset )
+    finally :
+        # Do not keep the descriptor open if file has changed since it was
+        # stat'ed, or if the cache is disabled.
+        if entry.token != info.token or not cache.set( info.docfile, entry ):
+            os.close( fd )
+
+def fdbudget( size ):
+    """Number of file descriptors to be cached, ``size`` limited to a
+    quarter of the process' soft limit on open files, RLIMIT_NOFILE."""
+    if resource is None : return size
+    soft, _ = resource.getrlimit( resource.RLIMIT_NOFILE )
+    return size if soft == resource.RLIM_INFINITY else min( size, soft // 4 )
+
+
+def byteranges( request, c, size, max_ranges ):
+    """Return a list of ``(first, last)`` byte positions requested by
+    ``request``'s `Range` header, for a static document of ``size`` bytes.
+    Return None if entire document is to be sent, that is, when `Range`
+    header is absent or invalid, or when `If-Range` validator does not match
+    the document, or when more than ``max_ranges`` ranges are requested, or
+    when the request's `If-Modified-Since` or `If-None-Match` validators
+    will answer it with `304 Not Modified`. An empty list means none of the
+    ranges are satisfiable.
+
+    Validators of the document, `etag` and `last_modified`, are expected to
+    be populated in context ``c``."""
+    value = request.headers.get( 'range', b'' )
+    if request.method != b'GET' or not value : return None
+    if _not_modified( request, c ) : return None
+
+    ifrange = request.headers.get( 'if_range', b'' ).strip()
+    if ifrange and not _if_range( request, c, ifrange ) : return None
+
+    ranges = h.parse_range( value, size )
+    if ranges and len( ranges ) > max_ranges : return None
+    return ranges
+
+def sendranges( plugin, request, info, ranges ):
+    """Send ``ranges`` of static document, described by ``info``, as
+    `206 Partial Content` response, or `416 Range Not Satisfiable` response
+    if ``ranges`` is empty. A single range is sent as it is, multiple ranges
+    are sent as `multipart/byteranges`. File content is read using
+    os.pread(), not more than ``range_window`` bytes at a time, and the next
+    window is read only after the previous one is flushed to the
+    connection."""
+    resp = request.response
+    size, window = info.size, plugin['range_window']
+    if not ranges :
+        resp.set_status( b'416' )
+        resp.set_header( 'content_range', 'bytes */%s' % size )
+        resp.flush( finishing=True )
+        return
+
+    resp.set_status( b'206' )
+    if len( ranges ) == 1 :
+        first, last = ranges[0]
+        resp.set_header( 'content_range', 'bytes %s-%s/%s' % (first,last,size))
+        segments = [ (first, last-first+1) ]
+    else :
+        boundary = uuid.uuid4().hex
+        mt = resp.media_type or 'application/octet-stream'
+        segments = []
+        for first, last in ranges :
+            part = '--%s\r\nContent-Type: %s\r\n' % (boundary, mt) + \
+                   'Content-Range: bytes %s-%s/%s\r\n\r\n' % (first,last,size)
+            segments.extend([ part.encode( 'utf-8' ),
+                              (first, last-first+1),
+                              b'\r\n' ])
+        segments.append( ('--%s--\r\n' % boundary).encode( 'utf-8' ))
+        resp.media_type = 'multipart/byteranges; boundary=' + boundary
+        resp.charset = None
+    resp.content_length = sum([ len(x) if isinstance(x, bytes) else x[1]
+                                for x in segments ])
+
+    def writewindow() :
+        if resp.statuscode != b'206' :
+            # Answered otherwise, like `304 Not Modified`, by out-bound
+            # transformers, while flushing the first window.
+            resp.flush( finishing=True )
+            return
+
+        while segments :
+            segment = segments.pop( 0 )
+            if isinstance( segment, bytes ) :
+                resp.write( segment )
+                continue
+            offset, length = segment
+            n = min( length, window )
+            resp.write( docread( plugin, info, n, offset ))
+            if n < length :
+                segments.insert( 0, (offset+n, length-n) )
+            break
+
+        if segments :
+            resp.flush( callback=writewindow )
+        else :
+            resp.flush( finishing=True )
+
+    writewindow()
+
+def _if_range( request, c, ifrange ):
+    """Evaluate `If-Range` validator ``ifrange`` against the document's
+    etag or last-modified date."""
+    if ifrange[:1] == b'"' or ifrange[:2] == b'W/' :
+        return _etag( request, c ) == ifrange     # Strong comparison.
+    last_modified = c.get( 'last_modified', '' )
+    return bool( last_modified ) and \
+           h.parse_date( ifrange ) == h.parse_date( last_modified )
+
+def _not_modified( request, c ):
+    """Whether the document is not modified as per request's
+    `If-Modified-Since` or `If-None-Match` validators, evaluated like
+    :class:`pluggdapps.web.response.ResponseHeaders` does."""
+    ims = request.headers.get( 'if_modified_since', b'' ).strip()
+    last_modified = c.get( 'last_modified', '' )
+    if ims and last_modified :
+        ims, last_modified = h.parse_date( ims ), h.parse_date(last_modified)
+        if ims and last_modified and ims >= last_modified : return True
+    inm = request.headers.get( 'if_none_match', b'' ).strip()
+    if inm :
+        return inm == b'*' or _etag( request, c )[:-1] in inm
+    return False
+
+def _etag( request, c ):
+    """Etag of the document as it will be sent in response."""
+    etag = request.response.headers.get( 'etag', None )
+    if etag is None :
+        etag = c.etag.hashout( prefix='view-', joinwith=c.get('etag','') )
+        etag = ('"%s"' % etag).encode( 'utf-8' )
+    return etag
+
 _default_settings = h.ConfigDict()
 _default_settings.__doc__ = StaticView.__doc__
 
@@ -79,3 +440,55 @@ _default_settings['max_age']  = {
                 "fresh in a HTTP cache."
 }
 
+_default_settings['immutable_max_age']  = {
+    'default' : 60*60*24*365,   # 1 year
+    'types'   : (int,),
+    'help'    : "Response max_age in seconds, for fingerprinted paths of "
+                "static files, which are sent as immutable."
+}
+_default_settings['max_ranges']  = {
+    'default' : 16,
+    'types'   : (int,),
+    'help'    : "Maximum number of byte-ranges, in a Range request, to be "
+                "answered with partial content. Requests with more ranges are "
+                "answered with the entire document."
+}
+_default_settings['range_window']  = {
+    'default' : 256 * 1024,
+    'types'   : (int,),
+    'help'    : "While sending partial content, file is read and flushed to "
+                "the connection in windows of these many bytes."
+}
+_default_settings['doccache_size']  = {
+    'default' : 32 * 1024 * 1024,
+    'types'   : (int,),
+    'help'    : "Maximum size, in bytes, of static documents' content and "
+                "meta-data to be cached in memory. Least recently used "
+                "documents are evicted."
+}
+_default_settings['doccache_content']  = {
+    'default' : 64 * 1024,
+    'types'   : (int,),
+    'help'    : "Content of static documents not larger than these many bytes "
+                "are cached in memory."
+}
+_default_settings['missing_size']  = {
+    'default' : 4096,
+    'types'   : (int,),
+    'help'    : "Maximum number of missing static documents to be remembered, "
+                "so that they are not looked up in the file system for every "
+                "request."
+}
+_default_settings['stat_interval']  = {
+    'default' : 2.0,
+    'types'   : (float,),
+    'help'    : "Cached static documents are revalidated against the file "
+                "system, not more than once for these many seconds."
+}
+_default_settings['fdcache_size']  = {
+    'default' : 128,
+    'types'   : (int,),
+    'help'    : "Maximum number of file descriptors, of large static "
+                "documents, to be kept open. Limited to a quarter of the "
+                "process' RLIMIT_NOFILE."
+}
@@ -4,7 +4,7 @@
 # file 'LICENSE', which is part of this source code package.
 #       Copyright (c) 2011 R Pratap Chakravarthy
 
-from   urllib.parse import urljoin
+from   urllib.parse import urljoin, urlsplit
 import sys
 
 from   pluggdapps.const          import URLSEP
@@ -13,6 +13,7 @@ from   pluggdapps.interfaces     import IWebApp
 from   pluggdapps.web.interfaces import IHTTPRouter,IHTTPCookie, IHTTPResponse,\
                                         IHTTPSession, IHTTPInBound, \
                                         IHTTPOutBound, IHTTPLiveDebug
+from   pluggdapps.web.accesslog  import AccessLog
 import pluggdapps.utils          as h
 
 class WebApp( Plugin ):
@@ -28,6 +29,14 @@ class WebApp( Plugin ):
 
     implements( IWebApp )
 
+    urlprefix = ''
+    """Scheme and netloc part of :attr:`baseurl`, computed once during
+    :meth:`startapp` and prefixed to url-paths generated by :meth:`urlfor`."""
+
+    accesslog = None
+    """:class:`pluggdapps.web.accesslog.AccessLog` object, if ``accesslog``
+    is configured."""
+
     def startapp( self ):
         """:meth:`pluggdapps.interfaces.IWebApps.startapp` interface method."""
         # Initialize plugins required to handle http request. 
@@ -40,29 +49,55 @@ class WebApp( Plugin ):
                 self.qp( IHTTPOutBound, name )
                 for name in self['IHTTPOutBound'] ]
 
+        # Long living plugins are retuned live on configuration changes.
+        for plugin in [ self, self.router, self.cookie ] + \
+                      self.in_transformers + self.out_transformers :
+            self.pa.subscribe( plugin, netpath=self.netpath )
+
+        # Access log.
+        self.accesslog = None
+        if self['accesslog'] :
+            self.accesslog = AccessLog(
+                    self['accesslog'], fmt=self['accesslog_format'],
+                    size=self['accesslog_buffer'],
+                    interval=self['accesslog_interval'],
+                    sample=self['accesslog_sample'],
+                    max_bytes=self.pa.logsett['max_bytes'],
+                    rotate_interval=self.pa.logsett['rotate_interval'],
+                    backups=self.pa.logsett['backups'] )
+
         # Live debug.
         if self['debug'] :
             self.livedebug = self.qp( IHTTPLiveDebug, self['IHTTPLiveDebug'] )
         else :
             self.livedebug = None
 
+        # Pre-join scheme and netloc of baseurl for absolute urls.
+        x = urlsplit( self.baseurl )
+        self.urlprefix = x.scheme + '://' + x.netloc if x.netloc else ''
+
         # Initialize plugins.
         self.router.onboot()
 
     def dorequest( self, request, body=None, chunk=None, trailers=None ):
         """:meth:`pluggdapps.interfaces.IWebApps.dorequest` interface method."""
         self.pa.logdebug( 
-          "[%s] %s %s" % (request.method,request.uri,request.httpconn.address))
+          "[%s] %s %s", (request.method,request.uri,request.httpconn.address),
+          name='web.webapp' )
 
         try :
             # Initialize framework attributes
             request.router = self.router
             request.cookie = self.cookie
-            # TODO : Initialize session attribute here.
             request.response = response = \
               self.qp( IHTTPResponse, self['IHTTPResponse'], request )
+            request.session = \
+              self.qp( IHTTPSession, self['IHTTPSession'], request ) \
+                    if self['IHTTPSession'] else None
             request.handle( body=body, chunk=chunk, trailers=trailers )
-            self.router.route( request )
+            # In-bound transformers can answer the request by themselves.
+            if not response.has_finished() :
+                self.router.route( request )
         except :
             self.pa.logerror( h.print_exc() )
             response.set_header( 'content_type', b'text/html' )
@@ -80,11 +115,16 @@ class WebApp( Plugin ):
     def dochunk( self, request, chunk=None, trailers=None ):
         """:meth:`pluggdapps.interfaces.IWebApps.dochunk` interface method."""
         request.handle( chunk=chunk, trailers=trailers )
-        self.router.route( request )
+        if not request.response.has_finished() :
+            self.router.route( request )
 
     def onfinish( self, request ):
         """:meth:`pluggdapps.interfaces.IWebApps.onfinish` interface method."""
         self.router.onfinish( request )
+        if getattr( request, 'session', None ) :
+            request.session.save()
+        if self.accesslog :
+            self.accesslog.record( request )
 
     def shutdown( self ):
         """:meth:`pluggdapps.interfaces.IWebApps.shutdown` interface method."""
@@ -96,7 +136,10 @@ class WebApp( Plugin ):
 
     def urlfor( self, request, *args, **kwargs ):
         """:meth:`pluggdapps.interfaces.IWebApps.urlfor` interface method."""
-        return urljoin( self.baseurl, self.pathfor(request, *args, **kwargs) )
+        path = self.pathfor( request, *args, **kwargs )
+        if self.urlprefix and path.startswith( URLSEP ) :
+            return self.urlprefix + path
+        return urljoin( self.baseurl, path )
 
     def pathfor( self, request, *args, **kwargs ):
         """:meth:`pluggdapps.interfaces.IWebApps.pathfor` interface method."""
@@ -105,7 +148,6 @@ class WebApp( Plugin ):
             if request.uriparts['script'] :
                 path = request.uriparts['script'] + path
         return path
-        return self.router.urlpath( request, *args, **kwargs )
 
 
 
@@ -124,6 +166,18 @@ class WebApp( Plugin ):
         sett['encoding'] = sett['encoding'].lower()
         sett['IHTTPInBound'] = h.parsecsvlines( sett['IHTTPInBound'] )
         sett['IHTTPOutBound'] = h.parsecsvlines( sett['IHTTPOutBound'] )
+        sett['accesslog_format'] = sett['accesslog_format'].strip().lower()
+        if sett['accesslog_format'] not in AccessLog.formats :
+            raise Exception( "accesslog_format %r is not one of %s" % (
+                    sett['accesslog_format'], ', '.join( AccessLog.formats )))
+        sett['accesslog_buffer'] = h.asint( sett['accesslog_buffer'] )
+        if not sett['accesslog_buffer'] or sett['accesslog_buffer'] < 1 :
+            raise Exception( "accesslog_buffer must be a positive integer" )
+        sett['accesslog_interval'] = h.asfloat( sett['accesslog_interval'] )
+        sett['accesslog_sample'] = h.asfloat( sett['accesslog_sample'] )
+        if sett['accesslog_sample'] is None or \
+                not 0.0 <= sett['accesslog_sample'] <= 1.0 :
+            raise Exception( "accesslog_sample must be between 0.0 and 1.0" )
         return sett
 
 _default_settings = h.ConfigDict()
@@ -191,5 +245,38 @@ _default_settings['IHTTPLiveDebug']  = {
                 "used to catch application exception and render them on "
                 "browser. Provides browser based debug interface."
 }
-
-
+_default_settings['accesslog']  = {
+    'default' : '',
+    'types'   : (str,),
+    'help'    : "File to log finished requests. Access log is disabled if not "
+                "configured. Log file is rotated as per ``logging.max_bytes``, "
+                "``logging.rotate_interval`` and ``logging.backups`` settings "
+                "of [pluggdapps] section."
+}
+_default_settings['accesslog_format']  = {
+    'default' : 'combined',
+    'types'   : (str,),
+    'help'    : "Access log format, `common` and `combined` for Common and "
+                "Combined Log Format, `json` for JSON lines. Combined "
+                "format is suffixed with request duration, in microseconds, "
+                "and request-id.",
+    'options' : AccessLog.formats,
+}
+_default_settings['accesslog_buffer']  = {
+    'default' : 1024,
+    'types'   : (int,),
+    'help'    : "Number of requests, at least 1, recorded in memory before "
+                "they are formatted and written to access log."
+}
+_default_settings['accesslog_interval']  = {
+    'default' : 1.0,
+    'types'   : (float,),
+    'help'    : "Recorded requests are written to access log within these "
+                "many seconds."
+}
+_default_settings['accesslog_sample']  = {
+    'default' : 1.0,
+    'types'   : (float,),
+    'help'    : "Fraction of requests to log, between 0.0 and 1.0. Requests "
+                "failing with server error are always logged."
+}